@@ -14,10 +14,34 @@ Routes:
     - /api/v1/users
     - /api/v1/places_amenities
 """
-from flask import Blueprint
+from flask import Blueprint, request
+from itertools import islice
+from models import storage
 
 app_views = Blueprint("app_views", __name__, url_prefix="/api/v1")
 
+
+def listing(cls):
+    """
+    Lists the objects of cls for a GET request on a collection.
+
+    With ?limit=N, at most N objects are returned, in id order, starting
+    after the id given by ?after=; the next page starts after the id of
+    the last object. Without limit, every object is returned.
+
+    :param cls: The class of the objects.
+    :return: The dictionaries of the objects.
+    :rtype: list
+    """
+    limit = request.args.get("limit", type=int)
+    if limit is None or limit <= 0:
+        objs = storage.all(cls).values()
+    else:
+        objs = islice(storage.iter(cls, limit, request.args.get("after")),
+                      limit)
+    return [obj.to_dict() for obj in objs]
+
+
 # Import views after app_views is defined
 from api.v1.views.places_amenities import *
 from api.v1.views.users import *
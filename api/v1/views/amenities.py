@@ -5,7 +5,7 @@ Amenities API endpoints.
 This module contains API endpoints for Amenities.
 """
 
-from api.v1.views import app_views
+from api.v1.views import app_views, listing
 from flask import jsonify, request, abort
 from models import storage
 from models.amenity import Amenity
@@ -17,6 +17,7 @@ from models.amenity import Amenity
 def get_amenities(amenity_id=None):
     """
     Retrieves the list of all Amenity objects or a specific Amenity object.
+    The list is paginated by ?limit= and ?after= (see listing()).
 
     :param amenity_id: ID of the Amenity to retrieve.
     :type amenity_id: str
@@ -29,15 +30,12 @@ def get_amenities(amenity_id=None):
             abort(404)
         return jsonify(amenity.to_dict())
 
-    amenities = list(storage.all(Amenity).values())
-    amenities_list = []
-    for amenity in amenities:
-        amenities_list.append(amenity.to_dict())
-    return jsonify(amenities_list)
+    return jsonify(listing(Amenity))
 
 
 @app_views.route("/amenities/<amenity_id>",
                  strict_slashes=False, methods=['DELETE'])
+@storage.transaction()
 def delete_amenity(amenity_id):
     """
     Delete an Amenity.
@@ -55,6 +53,7 @@ def delete_amenity(amenity_id):
 
 
 @app_views.route("/amenities", strict_slashes=False, methods=['POST'])
+@storage.transaction()
 def create_amenity():
     """
     Create an Amenity.
@@ -75,6 +74,7 @@ def create_amenity():
 
 @app_views.route("/amenities/<string:amenity_id>",
                  strict_slashes=False, methods=['PUT'])
+@storage.transaction()
 def update_amenity(amenity_id):
     """
     Updates an Amenity.
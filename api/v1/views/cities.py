@@ -53,6 +53,7 @@ def get_city(city_id):
 
 @app_views.route("/cities/<string:city_id>",
                  strict_slashes=False, methods=['DELETE'])
+@storage.transaction()
 def delete_city(city_id):
     """
     Deletes a city with a given ID.
@@ -71,6 +72,7 @@ def delete_city(city_id):
 
 @app_views.route("/states/<string:state_id>/cities",
                  strict_slashes=False, methods=['POST'])
+@storage.transaction()
 def create_city(state_id):
     """
     Creates a city in the specified state.
@@ -96,6 +98,7 @@ def create_city(state_id):
 
 @app_views.route("/cities/<string:city_id>",
                  strict_slashes=False, methods=['PUT'])
+@storage.transaction()
 def update_city(city_id):
     """
     Updates a city with a given ID.
@@ -45,9 +45,10 @@ def stats():
     :return: JSON response containing the count of objects for each endpoint.
     :rtype: Response
     """
+    counts = storage.counts(*endpoints_dict.values())
     stats_data = {}
     for endpoint, model_class in endpoints_dict.items():
-        stats_data[endpoint] = storage.count(model_class)
+        stats_data[endpoint] = counts[model_class]
     return jsonify(stats_data)
 
 
@@ -11,7 +11,6 @@ from models import storage
 from models.city import City
 from models.place import Place
 from models.user import User
-from models.state import State
 from models.amenity import Amenity
 
 
@@ -29,7 +28,7 @@ def get_city_places(city_id):
     city = storage.get(City, city_id)
     if city is not None:
         places_list = []
-        for place in city.places:
+        for place in storage.all(Place, city_id=city.id).values():
             places_list.append(place.to_dict())
         return jsonify(places_list)
     else:
@@ -56,6 +55,7 @@ def get_place(place_id):
 
 @app_views.route("/places/<string:place_id>",
                  strict_slashes=False, methods=['DELETE'])
+@storage.transaction()
 def delete_place(place_id):
     """
     Deletes a Place with a given ID.
@@ -74,6 +74,7 @@ def delete_place(place_id):
 
 @app_views.route("/cities/<string:city_id>/places",
                  strict_slashes=False, methods=['POST'])
+@storage.transaction()
 def create_place(city_id):
     """
     Creates a Place in the specified city.
@@ -134,6 +135,7 @@ def create_place(city_id):
 
 @app_views.route("/places/<string:place_id>",
                  strict_slashes=False, methods=['PUT'])
+@storage.transaction()
 def update_place(place_id):
     """
     Updates a Place with a given ID.
@@ -183,22 +185,16 @@ def places_search():
     if not states and not cities and not amenities:
         places = list(storage.all(Place).values())
 
+    city_ids = set(cities)
     if states:
-        for state_id in states:
-            state = storage.get(State, state_id)
-            if state:
-                for city in state.cities:
-                    places.extend(city.places)
-                    if city.id in cities:
-                        cities.remove(city.id)
-
-    if cities:
-        for city_id in cities:
-            city = storage.get(City, city_id)
-            if city:
-                places.extend(city.places)
+        city_ids.update(city.id for city in
+                        storage.all(City, state_id__in=states).values())
+
+    if city_ids:
+        places = list(storage.all(Place, city_id__in=city_ids).values())
 
     if amenities:
+        storage.prefetch(places, "amenities")
         for place in places.copy():
             if len(amenities) != len(place.amenities):
                 places.remove(place)
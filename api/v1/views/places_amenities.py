@@ -7,7 +7,7 @@ This module contains API endpoints for handling Amenities of Places.
 
 from api.v1.views import app_views
 from flask import jsonify, abort
-from models import storage, storage_type
+from models import storage, sql_storage
 from models.amenity import Amenity
 from models.place import Place
 
@@ -36,6 +36,7 @@ def get_place_amenities(place_id):
 
 @app_views.route("/places/<place_id>/amenities/<amenity_id>",
                  strict_slashes=False, methods=['DELETE'])
+@storage.transaction()
 def delete_place_amenity(place_id, amenity_id):
     """
     Deletes an Amenity object linked to a Place.
@@ -55,7 +56,7 @@ def delete_place_amenity(place_id, amenity_id):
     if not amenity:
         abort(404)
 
-    if storage_type == 'db':
+    if sql_storage:
         found_amenities = list(
             filter(
                 lambda d: d.id == amenity_id,
@@ -69,10 +70,11 @@ def delete_place_amenity(place_id, amenity_id):
     if not found_amenities:
         abort(404)
 
-    if storage_type == 'db':
+    if sql_storage:
         place.amenities.remove(amenity)
     else:
-        place.amenity_ids.remove(amenity_id)
+        place.amenity_ids = [id for id in place.amenity_ids
+                             if id != amenity_id]
 
     place.save()
     return jsonify({})
@@ -80,6 +82,7 @@ def delete_place_amenity(place_id, amenity_id):
 
 @app_views.route("/places/<place_id>/amenities/<amenity_id>",
                  strict_slashes=False, methods=['POST'])
+@storage.transaction()
 def link_amenity_place(place_id, amenity_id):
     """
     Links an Amenity object to a Place.
@@ -99,7 +102,7 @@ def link_amenity_place(place_id, amenity_id):
     if not amenity:
         abort(404)
 
-    if storage_type == 'db':
+    if sql_storage:
         found_amenities = list(
             filter(
                 lambda d: d.id == amenity_id,
@@ -113,10 +116,10 @@ def link_amenity_place(place_id, amenity_id):
     if len(found_amenities) == 1:
         return jsonify(amenity.to_dict()), 200
 
-    if storage_type == 'db':
+    if sql_storage:
         place.amenities.append(amenity)
     else:
-        place.amenity_ids.append(amenity_id)
+        place.amenity_ids = place.amenity_ids + [amenity_id]
 
     place.save()
     return jsonify(amenity.to_dict()), 201
@@ -55,6 +55,7 @@ def get_review(review_id):
 
 @app_views.route("/reviews/<string:review_id>",
                  strict_slashes=False, methods=['DELETE'])
+@storage.transaction()
 def delete_review(review_id):
     """
     Deletes a Review object with a given ID.
@@ -74,6 +75,7 @@ def delete_review(review_id):
 
 @app_views.route("/places/<string:place_id>/reviews",
                  strict_slashes=False, methods=['POST'])
+@storage.transaction()
 def create_review(place_id):
     """
     Creates a Review for a given Place.
@@ -111,6 +113,7 @@ def create_review(place_id):
 
 @app_views.route("/reviews/<string:review_id>",
                  strict_slashes=False, methods=['PUT'])
+@storage.transaction()
 def update_review(review_id):
     """
     Updates a Review object with a given ID.
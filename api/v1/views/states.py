@@ -5,7 +5,7 @@ State API endpoints.
 This module contains API endpoints for handling State objects.
 """
 
-from api.v1.views import app_views
+from api.v1.views import app_views, listing
 from flask import jsonify, request, abort
 from models import storage
 from models.state import State
@@ -14,13 +14,13 @@ from models.state import State
 @app_views.route("/states", strict_slashes=False, methods=['GET'])
 def get_states():
     """
-    Retrieves the list of all State objects.
+    Retrieves the list of all State objects, or a page of them with
+    ?limit= and ?after= (see listing()).
 
     :return: JSON response containing the list of all states.
     :rtype: Response
     """
-    states = list(storage.all(State).values())
-    return jsonify([state.to_dict() for state in states])
+    return jsonify(listing(State))
 
 
 @app_views.route("/states/<string:state_id>",
@@ -43,6 +43,7 @@ def get_state(state_id):
 
 @app_views.route("/states/<string:state_id>",
                  strict_slashes=False, methods=['DELETE'])
+@storage.transaction()
 def delete_state(state_id):
     """
     Deletes a State object with a given ID.
@@ -61,6 +62,7 @@ def delete_state(state_id):
 
 
 @app_views.route("/states", strict_slashes=False, methods=['POST'])
+@storage.transaction()
 def create_state():
     """
     Creates a new State object.
@@ -83,6 +85,7 @@ def create_state():
 
 @app_views.route("/states/<string:state_id>",
                  strict_slashes=False, methods=['PUT'])
+@storage.transaction()
 def update_state(state_id):
     """
     Updates a State object with a given ID.
@@ -5,7 +5,7 @@ Users API endpoints.
 This module contains API endpoints for handling User objects.
 """
 
-from api.v1.views import app_views
+from api.v1.views import app_views, listing
 from flask import jsonify, request, abort
 from models import storage
 from models.user import User
@@ -14,13 +14,13 @@ from models.user import User
 @app_views.route("/users", strict_slashes=False, methods=['GET'])
 def get_users():
     """
-    Retrieves the list of all User objects.
+    Retrieves the list of all User objects, or a page of them with
+    ?limit= and ?after= (see listing()).
 
     :return: JSON response containing the list of all users.
     :rtype: Response
     """
-    users = [user.to_dict() for user in storage.all(User).values()]
-    return jsonify(users)
+    return jsonify(listing(User))
 
 
 @app_views.route("/users/<string:user_id>",
@@ -43,6 +43,7 @@ def get_user(user_id):
 
 @app_views.route("/users/<string:user_id>",
                  strict_slashes=False, methods=['DELETE'])
+@storage.transaction()
 def delete_user(user_id):
     """
     Deletes a User object with a given ID.
@@ -61,6 +62,7 @@ def delete_user(user_id):
 
 
 @app_views.route("/users", strict_slashes=False, methods=['POST'])
+@storage.transaction()
 def create_user():
     """
     Creates a new User object.
@@ -95,6 +97,7 @@ def create_user():
 
 @app_views.route("/users/<string:user_id>",
                  strict_slashes=False, methods=['PUT'])
+@storage.transaction()
 def update_user(user_id):
     """
     Updates a User object with a given ID.
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""
+Benchmark the bulk methods of the storage engine against one save()
+per object.
+
+Creates N States with new() and save() for each of them, then with
+bulk_new(), and times bulk_update() and bulk_delete() on the same
+States. Runs against a FileStorage in a temp dir, or against a
+SQLiteStorage there when HBNB_TYPE_STORAGE=sqlite.
+
+Usage: python3 -m benchmarks.bulk [N ...]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import models
+from models.state import State
+
+SIZES = [1000, 10000]
+
+
+def open_storage(tmp):
+    """Return an empty storage engine keeping its data in tmp."""
+    if models.storage_type == "sqlite":
+        from models.engine.sqlite_storage import SQLiteStorage
+        storage = SQLiteStorage(os.path.join(tmp, "hbnb.db"))
+        storage.reload()
+        return storage
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage.__new__(FileStorage)
+    FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+    FileStorage._FileStorage__journal = False
+    FileStorage._FileStorage__objects.clear()
+    FileStorage._FileStorage__classes.clear()
+    FileStorage._FileStorage__fragments.clear()
+    return storage
+
+
+def timed(function, *args, **kwargs):
+    """Return the seconds taken by function(*args, **kwargs)."""
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def one_by_one(storage, objs):
+    """Save objs the way BaseModel.save() does, one at a time."""
+    for obj in objs:
+        storage.new(obj)
+        storage.save()
+
+
+def main(sizes):
+    """Print the objects per second of each method for each size."""
+    print("{:>8} {:>12} {:>12} {:>12} {:>12}".format(
+        "objects", "save (/s)", "new (/s)", "update (/s)", "delete (/s)"))
+    for size in sizes:
+        tmp = tempfile.mkdtemp()
+        try:
+            storage = open_storage(tmp)
+            saved = timed(one_by_one, storage,
+                          [State(name="State") for _ in range(size)])
+            storage.close()
+            os.mkdir(os.path.join(tmp, "bulk"))
+            storage = open_storage(os.path.join(tmp, "bulk"))
+            states = [State(name="State") for _ in range(size)]
+            rates = [size / saved,
+                     size / timed(storage.bulk_new, states),
+                     size / timed(storage.bulk_update, states,
+                                  name="Renamed"),
+                     size / timed(storage.bulk_delete, states)]
+            storage.close()
+        finally:
+            shutil.rmtree(tmp)
+        print("{:>8} {:>12.0f} {:>12.0f} {:>12.0f} {:>12.0f}".format(
+            size, *rates))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Benchmark the JSON and binary snapshot formats of FileStorage.
+
+Fills the store with N Places, then times a full save() and a reload()
+in each format and reports the snapshot sizes.
+
+Usage: python3 -m benchmarks.file_storage_format [N ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+SIZES = [1000000]
+FORMATS = {"json": "file.json", "binary": "file.hbnb"}
+
+
+def clear():
+    """Empty the in-memory store and its caches."""
+    FileStorage._FileStorage__objects.clear()
+    FileStorage._FileStorage__classes.clear()
+    FileStorage._FileStorage__relations.clear()
+    FileStorage._FileStorage__links.clear()
+    FileStorage._FileStorage__fragments.clear()
+    FileStorage._FileStorage__dirty.clear()
+
+
+def main(sizes):
+    """Print save/reload times and sizes for each format and size."""
+    storage = FileStorage.__new__(FileStorage)
+    tmp = tempfile.mkdtemp()
+    FileStorage._FileStorage__journal = False
+    FileStorage._FileStorage__shards = 0
+    print("{:>9} {:>7} {:>10} {:>11} {:>10}".format(
+        "objects", "format", "save (s)", "reload (s)", "size (MB)"))
+    for size in sizes:
+        for fmt, name in FORMATS.items():
+            path = os.path.join(tmp, name)
+            FileStorage._FileStorage__format = fmt
+            FileStorage._FileStorage__file_path = path
+            clear()
+            for i in range(size):
+                storage.new(Place(name="Place {}".format(i),
+                                  city_id="city", user_id="user",
+                                  number_rooms=i % 5, latitude=37.7,
+                                  longitude=-122.4))
+            FileStorage._FileStorage__fragments.clear()
+
+            start = time.perf_counter()
+            storage.save()
+            saved = time.perf_counter() - start
+
+            clear()
+            start = time.perf_counter()
+            storage.reload()
+            loaded = time.perf_counter() - start
+            print("{:>9} {:>7} {:>10.3f} {:>11.3f} {:>10.1f}".format(
+                size, fmt, saved, loaded, os.path.getsize(path) / 1e6))
+            os.remove(path)
+    clear()
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
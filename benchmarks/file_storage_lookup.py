@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+Benchmark FileStorage primary-key lookups as the store grows.
+
+Fills the in-memory store with N States plus a fixed set of Places and
+times get(), all(cls) and count(cls) for the small class. With the
+per-class buckets the timings stay flat as N grows.
+
+Usage: python3 -m benchmarks.file_storage_lookup [N ...]
+"""
+
+import sys
+import timeit
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.state import State
+
+SIZES = [10000, 100000, 1000000]
+PLACES = 100
+REPEAT = 1000
+
+
+def fill(storage, size):
+    """Reset the store and add size States and PLACES Places."""
+    FileStorage._FileStorage__objects.clear()
+    FileStorage._FileStorage__classes.clear()
+    for _ in range(size):
+        storage.new(State())
+    places = [Place() for _ in range(PLACES)]
+    for place in places:
+        storage.new(place)
+    return places[-1]
+
+
+def main(sizes):
+    """Print per-call latencies for each store size."""
+    storage = FileStorage.__new__(FileStorage)
+    print("{:>9} {:>12} {:>12} {:>12}".format(
+        "objects", "get (us)", "all (us)", "count (us)"))
+    for size in sizes:
+        place = fill(storage, size)
+        timings = [
+            timeit.timeit(lambda: storage.get(Place, place.id),
+                          number=REPEAT),
+            timeit.timeit(lambda: storage.all(Place), number=REPEAT),
+            timeit.timeit(lambda: storage.count(Place), number=REPEAT),
+        ]
+        print("{:>9} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+            size + PLACES, *[t / REPEAT * 1e6 for t in timings]))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+Benchmark FileStorage.save() with a single dirty object.
+
+Fills the store with N States, saves once to warm the fragment cache,
+changes one State and times save() against re-encoding every object the
+way save() used to.
+
+Usage: python3 -m benchmarks.file_storage_save [N ...]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from models.engine.file_storage import FileStorage
+from models.state import State
+
+SIZES = [1000000]
+
+
+def full_save(storage, path):
+    """Serialize every object, as FileStorage.save() did originally."""
+    objects_dict = {
+        key: value.to_dict() for key,
+        value in storage.all().items()
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(objects_dict, file)
+
+
+def main(sizes):
+    """Print the save time of both approaches for each store size."""
+    storage = FileStorage.__new__(FileStorage)
+    tmp = tempfile.mkdtemp()
+    FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+    FileStorage._FileStorage__journal = False
+    print("{:>9} {:>14} {:>14}".format("objects", "full (s)", "dirty (s)"))
+    for size in sizes:
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        FileStorage._FileStorage__fragments.clear()
+        states = [State(name="State {}".format(i)) for i in range(size)]
+        for state in states:
+            storage.new(state)
+        storage.save()
+        states[0].name = "Renamed"
+
+        start = time.perf_counter()
+        full_save(storage, os.path.join(tmp, "full.json"))
+        full = time.perf_counter() - start
+
+        start = time.perf_counter()
+        storage.save()
+        dirty = time.perf_counter() - start
+        print("{:>9} {:>14.3f} {:>14.3f}".format(size, full, dirty))
+    for name in os.listdir(tmp):
+        os.remove(os.path.join(tmp, name))
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""
+Benchmark the import time of the console and of the API.
+
+Imports each entry point in a fresh interpreter with python -X importtime
+and reports the median cumulative import time, and how much of it was
+spent importing SQLAlchemy. Run it with HBNB_TYPE_STORAGE unset for the
+file storage, or set to compare with another engine.
+
+Usage: python3 -m benchmarks.startup [RUNS]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+TARGETS = ["console", "api.v1.app"]
+RUNS = 10
+
+
+def import_times(module):
+    """Return the cumulative import times (us) of the top-level modules.
+
+    sqlalchemy is reported even when it is imported by another module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        if not name.startswith("  ") or name.strip() == "sqlalchemy":
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(runs):
+    """Print the median import times of each target."""
+    print("{:>12} {:>12} {:>16}".format(
+        "target", "total (ms)", "sqlalchemy (ms)"))
+    for target in TARGETS:
+        totals, sqlalchemy = [], []
+        for _ in range(runs):
+            times = import_times(target)
+            sqlalchemy.append(times.pop("sqlalchemy", 0) / 1000)
+            totals.append(sum(times.values()) / 1000)
+        print("{:>12} {:>12.1f} {:>16.1f}".format(
+            target, statistics.median(totals),
+            statistics.median(sqlalchemy)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
@@ -108,8 +108,7 @@ class HBNBCommand(cmd.Cmd):
             # Check and handle the state_id attribute manually if provided
             if "state_id" in new_instance.__dict__:
                 state_id = new_instance.__dict__["state_id"]
-                if state_id not in [
-                        state.id for state in storage.all(State).values()]:
+                if storage.get(State, state_id) is None:
                     raise ValueError("State ID doesn't exist")
 
             new_instance.save()
@@ -179,7 +178,7 @@ class HBNBCommand(cmd.Cmd):
             objects = storage.all()
             key = "{}.{}".format(class_name, args[1])
             if key in objects:
-                del objects[key]
+                storage.delete(objects[key])
                 storage.save()
             else:
                 raise KeyError("No instance found")
@@ -202,16 +201,22 @@ class HBNBCommand(cmd.Cmd):
         If no class is specified, displays all instantiated objects.
         """
         try:
-            args = split(line)
+            args = shlex.split(line)
             if len(args) > 0 and args[0] not in classes:
                 raise NameError("Class doesn't exist")
 
             if len(args) == 0:
-                objects = storage.all()
+                objects = storage.all().values()
             else:
-                objects = storage.all(classes[args[0]])
-
-            print([str(obj) for obj in objects.values()])
+                objects = storage.iter(classes[args[0]])
+
+            # Same output as printing the list, one object at a time
+            print("[", end="")
+            for i, obj in enumerate(objects):
+                if i:
+                    print(", ", end="")
+                print(repr(str(obj)), end="")
+            print("]")
 
         except NameError as e:
             print("** {} **".format(e))
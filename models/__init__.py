@@ -3,18 +3,17 @@
 Initialize the models package based on the storage type.
 """
 
+from models import engine
 from os import getenv
 
 # Get the storage type from the environment variable
 storage_type = getenv("HBNB_TYPE_STORAGE")
+# Whether the models are mapped to SQL tables
+sql_storage = storage_type in ("db", "sqlite")
 
-# Initialize the storage based on the storage type
-if storage_type == "db":
-    from models.engine.db_storage import DBStorage
-    storage = DBStorage()
-else:
-    from models.engine.file_storage import FileStorage
-    storage = FileStorage()
+# Initialize the storage based on the storage type; only the selected
+# engine is imported
+storage = engine.load(storage_type)()
 
 # Load the data from the storage
 storage.reload()
@@ -4,8 +4,11 @@ The Amenity class module.
 """
 
 from datetime import datetime
+import models
 from models.base_model import BaseModel, Base
-from sqlalchemy import Column, String, Integer
+
+if models.sql_storage:
+    from sqlalchemy import Column, String
 
 
 class Amenity(BaseModel, Base):
@@ -20,8 +23,11 @@ class Amenity(BaseModel, Base):
     """
 
     __tablename__ = "amenities"
-    id = Column(String(60), primary_key=True, nullable=False)
-    name = Column(String(128), nullable=False)
+    if models.sql_storage:
+        id = Column(String(60), primary_key=True, nullable=False)
+        name = Column(String(128), nullable=False, index=True)
+    else:
+        name = ""
     __table_args__ = {'mysql_default_charset': 'latin1'}
 
     def __init__(self, *args, **kwargs):
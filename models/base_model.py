@@ -5,15 +5,16 @@ Initialize the models package and create the BaseModel class.
 
 from datetime import datetime
 import models
-from os import getenv
-import sqlalchemy
-from sqlalchemy import Column, String, DateTime
-from sqlalchemy.ext.declarative import declarative_base
 import uuid
 
 time_format = "%Y-%m-%dT%H:%M:%S.%f"
+# Passed to storage.changed() for attributes that had no value before.
+UNSET = object()
 
-if models.storage_type == "db":
+# SQLAlchemy is only imported when the models are mapped to tables
+if models.sql_storage:
+    from sqlalchemy import Column, String, DateTime
+    from sqlalchemy.ext.declarative import declarative_base
     Base = declarative_base()
 else:
     Base = object
@@ -29,7 +30,7 @@ class BaseModel:
         updated_at (datetime): Date and time of last update.
     """
 
-    if models.storage_type == "db":
+    if models.sql_storage:
         id = Column(String(60), primary_key=True)
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow)
@@ -53,7 +54,7 @@ class BaseModel:
                     str):
                 self.created_at = datetime.strptime(
                     kwargs["created_at"], time_format)
-            else:
+            elif not isinstance(kwargs.get("created_at"), datetime):
                 self.created_at = datetime.utcnow()
             if kwargs.get(
                     "updated_at",
@@ -62,7 +63,7 @@ class BaseModel:
                     str):
                 self.updated_at = datetime.strptime(
                     kwargs["updated_at"], time_format)
-            else:
+            elif not isinstance(kwargs.get("updated_at"), datetime):
                 self.updated_at = datetime.utcnow()
             if kwargs.get("id", None) is None:
                 self.id = str(uuid.uuid4())
@@ -71,6 +72,20 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    def __setattr__(self, name, value):
+        """
+        Sets an attribute and notifies the storage engine of the change.
+
+        Args:
+            name (str): The attribute name.
+            value: The new value.
+        """
+        old = self.__dict__.get(name, UNSET)
+        super().__setattr__(name, value)
+        changed = getattr(getattr(models, "storage", None), "changed", None)
+        if changed is not None:
+            changed(self, name, old)
+
     def __str__(self):
         """
         Returns a string representation of the BaseModel class.
@@ -109,7 +124,7 @@ class BaseModel:
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
 
-        if "password" in new_dict and models.storage_type == "db":
+        if "password" in new_dict and models.sql_storage:
             del new_dict["password"]
 
         return new_dict
@@ -4,9 +4,14 @@ This module defines the City class, representing a city entity in the database.
 """
 
 import re
+import models
 from models.base_model import Base
-from sqlalchemy import Column, String, ForeignKey
 from models.base_model import BaseModel
+from models.place import Place
+
+if models.sql_storage:
+    from sqlalchemy import Column, String, ForeignKey
+    from sqlalchemy.orm import relationship
 
 
 class City(BaseModel, Base):
@@ -17,6 +22,7 @@ class City(BaseModel, Base):
         __tablename__ (str): The name of the table for storing City objects.
         state_id (sqlalchemy String): The foreign key to the states table.
         name (sqlalchemy String): The name of the city.
+        places (sqlalchemy relationship): City-Place relationship.
         __table_args__ (dict): Additional arguments for the SQLAlchemy table.
 
     Note:
@@ -26,8 +32,14 @@ class City(BaseModel, Base):
     """
 
     __tablename__ = 'cities'
-    state_id = Column(String(60), ForeignKey('states.id'), nullable=False)
-    name = Column(String(128), nullable=False)
+    if models.sql_storage:
+        state_id = Column(String(60), ForeignKey('states.id'),
+                          nullable=False, index=True)
+        name = Column(String(128), nullable=False, index=True)
+        places = relationship("Place", backref="city", cascade="delete")
+    else:
+        state_id = ""
+        name = ""
 
     # Add the __table_args__ attribute for specifying the charset
     __table_args__ = {'mysql_charset': 'latin1'}
@@ -53,3 +65,15 @@ class City(BaseModel, Base):
 
         # Debugging statements
         print("State ID before save:", self.state_id)
+
+    if not models.sql_storage:
+        @property
+        def places(self):
+            """
+            Get a list of all Place objects in the city.
+
+            Returns:
+                list: List of Place objects located in the city.
+            """
+            from models import storage
+            return list(storage.all(Place, city_id=self.id).values())
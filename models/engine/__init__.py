@@ -0,0 +1,29 @@
+#!/usr/bin/python3
+"""Registry of the storage engines.
+
+An engine module is only imported when load() selects it, so that the
+file storage does not pay for SQLAlchemy and the database drivers.
+"""
+
+from importlib import import_module
+
+# HBNB_TYPE_STORAGE value -> "<module>.<class>" of the engine
+engines = {
+    "file": "models.engine.file_storage.FileStorage",
+    "db": "models.engine.db_storage.DBStorage",
+    "sqlite": "models.engine.sqlite_storage.SQLiteStorage",
+}
+
+
+def register(name, path):
+    """Register the engine class at path under the storage type name."""
+    engines[name] = path
+
+
+def load(name):
+    """Import and return the engine class of the storage type name.
+
+    Unknown and unset storage types use the file storage.
+    """
+    module, _, cls = engines.get(name, engines["file"]).rpartition(".")
+    return getattr(import_module(module), cls)
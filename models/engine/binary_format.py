@@ -0,0 +1,323 @@
+#!/usr/bin/python3
+"""Binary snapshot format used by FileStorage when HBNB_FILE_FORMAT=binary.
+
+A snapshot starts with a header made of the magic bytes b"HBNB", a
+format version and the table of interned names, followed by one
+length-prefixed record per object:
+
+    header  = b"HBNB" version:u16 count:u32 (length:u16 utf-8)*count
+    record  = length:u32 key:str class:u16 count:u16 (name:u16 value)*count
+    value   = tag:u8 payload
+
+Names (attribute and class names) are stored once in the header and
+referenced by their index. datetime values are stored as microseconds
+since the epoch instead of strftime text.
+
+Usage: python3 -m models.engine.binary_format (to-binary|to-json) SRC DST
+"""
+
+from datetime import datetime, timedelta
+import json
+from models.base_model import time_format
+import os
+import struct
+import sys
+
+MAGIC = b"HBNB"
+VERSION = 1
+EPOCH = datetime(1970, 1, 1)
+
+NONE, STR, INT, FLOAT, TRUE, FALSE, DATETIME, LIST, DICT, JSON = range(10)
+
+_u8 = struct.Struct("<B")
+_u16 = struct.Struct("<H")
+_u32 = struct.Struct("<I")
+_i64 = struct.Struct("<q")
+_f64 = struct.Struct("<d")
+_name_str = struct.Struct("<HBI")
+
+
+class NameTable:
+    """Append-only table of interned names.
+
+    Attributes:
+        names (list): the interned names, in index order.
+        ids (dict): the index of each name.
+    """
+
+    def __init__(self, names=()):
+        """Create a table holding names."""
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+
+    def intern(self, name):
+        """Return the index of name, adding it to the table if needed."""
+        index = self.ids.get(name)
+        if index is None:
+            index = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def header(self):
+        """Return the snapshot header listing every interned name."""
+        parts = [MAGIC, _u16.pack(VERSION), _u32.pack(len(self.names))]
+        for name in self.names:
+            data = name.encode("utf-8")
+            parts.append(_u16.pack(len(data)) + data)
+        return b"".join(parts)
+
+
+def _encode_str(value):
+    """Return the length-prefixed utf-8 encoding of value."""
+    data = value.encode("utf-8")
+    return _u32.pack(len(data)) + data
+
+
+def _encode_value(value):
+    """Return the tagged encoding of value."""
+    if value is None:
+        return _u8.pack(NONE)
+    if value is True:
+        return _u8.pack(TRUE)
+    if value is False:
+        return _u8.pack(FALSE)
+    if isinstance(value, str):
+        return _u8.pack(STR) + _encode_str(value)
+    if isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+        return _u8.pack(INT) + _i64.pack(value)
+    if isinstance(value, float):
+        return _u8.pack(FLOAT) + _f64.pack(value)
+    if isinstance(value, datetime):
+        micros = (value - EPOCH) // timedelta(microseconds=1)
+        return _u8.pack(DATETIME) + _i64.pack(micros)
+    if isinstance(value, (list, tuple)):
+        return b"".join([_u8.pack(LIST), _u32.pack(len(value))] +
+                        [_encode_value(item) for item in value])
+    if isinstance(value, dict):
+        parts = [_u8.pack(DICT), _u32.pack(len(value))]
+        for key, item in value.items():
+            parts.append(_encode_str(str(key)) + _encode_value(item))
+        return b"".join(parts)
+    return _u8.pack(JSON) + _encode_str(json.dumps(value))
+
+
+def encode(key, obj_dict, table):
+    """Return the record for obj_dict, stored under key.
+
+    Args:
+        key (str): the <class name>.<id> key of the object.
+        obj_dict (dict): the attributes of the object, including its
+            "__class__" name.
+        table (NameTable): the table used to intern names.
+    """
+    ids = table.ids
+    parts = [_encode_str(key),
+             _u16.pack(table.intern(obj_dict["__class__"])),
+             _u16.pack(len(obj_dict) - 1)]
+    for name, value in obj_dict.items():
+        if name == "__class__":
+            continue
+        index = ids.get(name)
+        if index is None:
+            index = table.intern(name)
+        if type(value) is str:
+            data = value.encode("utf-8")
+            parts.append(_name_str.pack(index, STR, len(data)))
+            parts.append(data)
+        else:
+            parts.append(_u16.pack(index))
+            parts.append(_encode_value(value))
+    payload = b"".join(parts)
+    return _u32.pack(len(payload)) + payload
+
+
+def dump(records, table, file):
+    """Write a snapshot made of encoded records to a binary file."""
+    file.write(table.header())
+    file.write(b"".join(records))
+
+
+class _Reader:
+    """Cursor over one record payload."""
+
+    def __init__(self, data):
+        """Start reading data at its first byte."""
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt):
+        """Read one value packed with the struct fmt."""
+        value, = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return value
+
+    def string(self):
+        """Read a length-prefixed utf-8 string."""
+        size = self.unpack(_u32)
+        value = self.data[self.pos:self.pos + size].decode("utf-8")
+        self.pos += size
+        return value
+
+    def value(self):
+        """Read a tagged value."""
+        tag = self.unpack(_u8)
+        if tag == NONE:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == STR:
+            return self.string()
+        if tag == INT:
+            return self.unpack(_i64)
+        if tag == FLOAT:
+            return self.unpack(_f64)
+        if tag == DATETIME:
+            return EPOCH + timedelta(microseconds=self.unpack(_i64))
+        if tag == LIST:
+            return [self.value() for _ in range(self.unpack(_u32))]
+        if tag == DICT:
+            items = {}
+            for _ in range(self.unpack(_u32)):
+                key = self.string()
+                items[key] = self.value()
+            return items
+        if tag == JSON:
+            return json.loads(self.string())
+        raise ValueError("Unknown value tag {}".format(tag))
+
+
+def _read_exactly(file, size):
+    """Read size bytes from file, failing on a short read."""
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of snapshot")
+    return data
+
+
+def read_header(file):
+    """Read the snapshot header of a binary file.
+
+    Returns:
+        NameTable: the names interned by the snapshot.
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not an HBNB binary snapshot")
+    version, = _u16.unpack(_read_exactly(file, _u16.size))
+    if version != VERSION:
+        raise ValueError("Unsupported snapshot version {}".format(version))
+    count, = _u32.unpack(_read_exactly(file, _u32.size))
+    names = []
+    for _ in range(count):
+        size, = _u16.unpack(_read_exactly(file, _u16.size))
+        names.append(_read_exactly(file, size).decode("utf-8"))
+    return NameTable(names)
+
+
+def decode(payload, table):
+    """Return the (key, attributes) pair stored in a record payload."""
+    reader = _Reader(payload)
+    key = reader.string()
+    obj_dict = {"__class__": table.names[reader.unpack(_u16)]}
+    for _ in range(reader.unpack(_u16)):
+        name = table.names[reader.unpack(_u16)]
+        obj_dict[name] = reader.value()
+    return key, obj_dict
+
+
+def load(file, progress=None):
+    """Yield the (key, attributes) pairs of a binary snapshot, in order.
+
+    Args:
+        file: a file opened in binary mode.
+        progress (callable, optional): called as progress(done, total)
+            with the number of bytes read so far and the file size.
+    """
+    total = os.fstat(file.fileno()).st_size
+    table = read_header(file)
+    done = file.tell()
+    while True:
+        prefix = file.read(_u32.size)
+        if not prefix:
+            return
+        if len(prefix) != _u32.size:
+            raise ValueError("Unexpected end of snapshot")
+        size, = _u32.unpack(prefix)
+        yield decode(_read_exactly(file, size), table)
+        done += _u32.size + size
+        if progress is not None:
+            progress(done, total)
+
+
+def scan(buffer):
+    """Index the records of a binary snapshot without decoding them.
+
+    Args:
+        buffer (mmap.mmap): the mapped snapshot.
+
+    Returns:
+        tuple: the NameTable of the snapshot and a generator of
+            (key, start, end) triples, where buffer[start:end] is the
+            whole record, length prefix included.
+    """
+    buffer.seek(0)
+    table = read_header(buffer)
+
+    def records(pos):
+        """Yield the (key, start, end) triple of each record."""
+        while pos < len(buffer):
+            size, = _u32.unpack_from(buffer, pos)
+            length, = _u32.unpack_from(buffer, pos + 4)
+            key = bytes(buffer[pos + 8:pos + 8 + length]).decode("utf-8")
+            end = pos + 4 + size
+            if end > len(buffer):
+                raise ValueError("Unexpected end of snapshot")
+            yield key, pos, end
+            pos = end
+
+    return table, records(buffer.tell())
+
+
+def json_to_binary(src, dst):
+    """Convert a file.json snapshot into a binary snapshot.
+
+    The created_at and updated_at strings are stored as timestamps.
+    """
+    with open(src, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    table = NameTable()
+    records = []
+    for key, obj_dict in data.items():
+        for name in ("created_at", "updated_at"):
+            if isinstance(obj_dict.get(name), str):
+                try:
+                    obj_dict[name] = datetime.fromisoformat(obj_dict[name])
+                except ValueError:
+                    pass
+        records.append(encode(key, obj_dict, table))
+    with open(dst, "wb") as file:
+        dump(records, table, file)
+
+
+def binary_to_json(src, dst):
+    """Convert a binary snapshot into a file.json snapshot."""
+    data = {}
+    with open(src, "rb") as file:
+        for key, obj_dict in load(file):
+            for name, value in obj_dict.items():
+                if isinstance(value, datetime):
+                    obj_dict[name] = value.strftime(time_format)
+            data[key] = obj_dict
+    with open(dst, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-binary", "to-json"):
+        print("Usage: {} (to-binary|to-json) SRC DST".format(sys.argv[0]))
+        sys.exit(1)
+    if sys.argv[1] == "to-binary":
+        json_to_binary(sys.argv[2], sys.argv[3])
+    else:
+        binary_to_json(sys.argv[2], sys.argv[3])
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""Filter criteria accepted by storage.all() and storage.count().
+
+Criteria are keyword arguments naming an attribute, optionally followed
+by an operator suffix:
+
+    name="Texas"              name equals "Texas"
+    state_id__in=[id1, id2]   state_id is one of id1, id2
+    price_by_night__gte=100   price_by_night >= 100 (also __gt, __lt, __lte)
+
+Every criterion must hold for an object to match. In memory, a list
+attribute such as Place.amenity_ids matches when any of its items does.
+
+Functions:
+    parse: Turns criteria into (attribute, operator, value) conditions.
+    matches: Tells whether an object satisfies conditions.
+"""
+
+import operator
+
+OPERATORS = {
+    "eq": operator.eq,
+    "in": lambda value, values: value in values,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+_MISSING = object()
+
+
+def parse(criteria):
+    """Return the (attribute, operator, value) conditions of criteria.
+
+    The values of __in criteria are turned into lists.
+    """
+    conditions = []
+    for name, value in criteria.items():
+        attr, _, op = name.rpartition("__")
+        if not attr or op not in OPERATORS:
+            attr, op = name, "eq"
+        if op == "in":
+            if isinstance(value, (str, bytes)):
+                raise TypeError("{} expects a list of values".format(name))
+            value = list(value)
+        conditions.append((attr, op, value))
+    return conditions
+
+
+def matches(obj, conditions):
+    """Tell whether obj satisfies every condition.
+
+    Objects without the attribute, or whose value cannot be compared
+    with the criterion, do not match.
+    """
+    for attr, op, value in conditions:
+        items = getattr(obj, attr, _MISSING)
+        if items is _MISSING:
+            return False
+        if not isinstance(items, (list, tuple)):
+            items = [items]
+        try:
+            if not any(OPERATORS[op](item, value) for item in items):
+                return False
+        except TypeError:
+            return False
+    return True
@@ -5,23 +5,99 @@ This module defines the DBStorage engine used for database storage.
 It provides methods for querying, adding, and deleting objects
 from the database.
 
+Setting HBNB_DB_CACHE_SIZE=N keeps the N objects most recently
+returned by get() in a cache shared by every request, for at most
+HBNB_DB_CACHE_TTL seconds (60 by default).
+
+The pool of the MySQL engine is sized by HBNB_DB_POOL_SIZE (5),
+HBNB_DB_MAX_OVERFLOW (10) and HBNB_DB_POOL_TIMEOUT (30 seconds);
+HBNB_DB_POOL_RECYCLE replaces connections older than that many seconds,
+and HBNB_DB_POOL_PRE_PING=0 skips the liveness check run on every
+checkout. pool_stats() reports how the pool, and the pool of each read
+replica, is used.
+
+counts() answers the number of objects of every class from counters
+kept up to date by the commits of this process. They are read with a
+single UNION ALL query when first needed, and again once they are
+HBNB_DB_COUNT_TTL seconds old (60 by default) to pick up the changes of
+other processes.
+
+bulk_new(), bulk_update() and bulk_delete() flush their objects in
+batched statements and commit every HBNB_DB_BULK_CHUNK objects (1000 by
+default).
+
+HBNB_DB_REPLICAS lists the URLs of read replicas, separated by commas.
+Each session then reads from one of them until it writes: new(),
+save(), delete(), transaction() and any flush make the session stick to
+the primary until close(), so a request reads its own writes.
+
+A database created by reload() is stamped with the latest version of
+models.engine.migrations; one created by an older release is brought up
+to date with migrate(), or python3 -m models.engine.migrations upgrade.
+
+all() and count() accept the criteria of models.engine.criteria,
+which are turned into the WHERE clause of the query.
+
 Classes:
     DBStorage: Represents the database storage engine.
+    RoutingSession: Session reading from a replica until it writes.
 """
 
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
 from os import getenv
+import random
+import threading
+import time
 from models.base_model import Base
 from models.amenity import Amenity
 from models.city import City
+from models.engine import migrations
+from models.engine.criteria import OPERATORS, parse
+from models.engine.object_cache import ObjectCache
+from models.engine.pool_monitor import MonitoredQueuePool, PoolMonitor
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
-from sqlalchemy import create_engine
-from sqlalchemy.orm import relationship, scoped_session, sessionmaker
+from sqlalchemy import create_engine, event, func, inspect, literal, \
+    select, union_all
+from sqlalchemy.orm import relationship, scoped_session, selectinload, \
+    Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 import pymysql
 
 
+class RoutingSession(Session):
+    """
+    Session reading from a replica until it writes.
+
+    Attributes:
+        replica (sqlalchemy.Engine): the engine serving the reads of the
+            session, or None to read from the primary.
+        primary (bool): whether the session sticks to the primary.
+    """
+
+    def __init__(self, replicas=(), **kwargs):
+        """Create a session reading from one of replicas, if any."""
+        super().__init__(**kwargs)
+        self.replica = random.choice(replicas) if replicas else None
+        self.primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """Return the engine for a statement.
+
+        Flushes and INSERT/UPDATE/DELETE statements go to the primary,
+        and make the session stick to it.
+        """
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.primary = True
+        if self.primary or self.replica is None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        return self.replica
+
+
 class DBStorage:
     """
     Represents the database storage engine.
@@ -31,75 +107,405 @@ class DBStorage:
             for database connection.
         __session (sqlalchemy.Session): SQLAlchemy session
             to interact with the database.
+        __local (threading.local): whether each thread is inside
+            a transaction().
+        __cache (ObjectCache): objects returned by get(), keyed by
+            (class, id), or None when HBNB_DB_CACHE_SIZE is not set.
+        __chunk_size (int): number of objects committed at a time by
+            the bulk methods.
+        __monitor (PoolMonitor): telemetry of the connection pool.
+        __replicas (list): engines of the read replicas.
+        __replica_monitors (list): telemetry of the pool of each replica.
+        __counts (dict): number of rows of each class, or None until
+            counts() reads them.
+        __counts_at (float): time.monotonic() when __counts was read.
     """
 
     __engine = None
     __session = None
+    __models = (State, City, User, Place, Review, Amenity)
+    __local = threading.local()
 
-    def __init__(self):
+    def __init__(self, engine=None, replicas=None):
         """Initialize a new DBStorage instance.
 
         The constructor creates a new database engine
         and sets up the session.
         If the environment is set to 'test', it drops all tables
         and recreates them.
+
+        Args:
+            engine (sqlalchemy.Engine, optional): Engine to use instead
+                of the MySQL one configured by the HBNB_MYSQL_* variables.
+            replicas (list, optional): Engines of the read replicas.
+                Defaults to the URLs listed by HBNB_DB_REPLICAS.
         """
-        self.__engine = create_engine("mysql+pymysql://{}:{}@{}/{}".
-                                      format(getenv("HBNB_MYSQL_USER"),
-                                             getenv("HBNB_MYSQL_PWD"),
-                                             getenv("HBNB_MYSQL_HOST"),
-                                             getenv("HBNB_MYSQL_DB")),
-                                      pool_pre_ping=True)
+        if engine is None:
+            engine = create_engine("mysql+pymysql://{}:{}@{}/{}".
+                                   format(getenv("HBNB_MYSQL_USER"),
+                                          getenv("HBNB_MYSQL_PWD"),
+                                          getenv("HBNB_MYSQL_HOST"),
+                                          getenv("HBNB_MYSQL_DB")),
+                                   poolclass=MonitoredQueuePool,
+                                   **self.pool_options())
+        if replicas is None:
+            replicas = [create_engine(url.strip(),
+                                      poolclass=MonitoredQueuePool,
+                                      **self.pool_options())
+                        for url in getenv("HBNB_DB_REPLICAS", "").split(",")
+                        if url.strip()]
+        self.__engine = engine
+        self.__replicas = replicas
+        self.__monitor = PoolMonitor()
+        self.__monitor.attach(engine)
+        self.__replica_monitors = []
+        for replica in replicas:
+            monitor = PoolMonitor()
+            monitor.attach(replica)
+            self.__replica_monitors.append(monitor)
+        size = int(getenv("HBNB_DB_CACHE_SIZE", "0"))
+        self.__cache = None
+        if size > 0:
+            self.__cache = ObjectCache(
+                size, float(getenv("HBNB_DB_CACHE_TTL", "60")))
+        self.__chunk_size = int(getenv("HBNB_DB_BULK_CHUNK", "1000"))
+        self.__counts = None
+        self.__counts_at = 0
+        self.__counts_ttl = float(getenv("HBNB_DB_COUNT_TTL", "60"))
+        self.__counts_lock = threading.Lock()
         if getenv("HBNB_ENV") == "test":
             Base.metadata.drop_all(self.__engine)
-            Base.metadata.create_all(self.__engine)
+            migrations.schema_version.drop(self.__engine, checkfirst=True)
+
+    @staticmethod
+    def pool_options():
+        """Return the create_engine() pool arguments set by HBNB_DB_*."""
+        return {
+            "pool_size": int(getenv("HBNB_DB_POOL_SIZE", "5")),
+            "max_overflow": int(getenv("HBNB_DB_MAX_OVERFLOW", "10")),
+            "pool_timeout": float(getenv("HBNB_DB_POOL_TIMEOUT", "30")),
+            "pool_recycle": int(getenv("HBNB_DB_POOL_RECYCLE", "-1")),
+            "pool_pre_ping": getenv("HBNB_DB_POOL_PRE_PING", "1") != "0",
+        }
+
+    def pool_stats(self):
+        """Return the statistics of the connection pool.
+
+        Returns:
+            dict: see PoolMonitor.stats(), with "replicas" listing the
+                statistics of the pool of each read replica.
+        """
+        stats = self.__monitor.stats()
+        stats["replicas"] = [monitor.stats()
+                             for monitor in self.__replica_monitors]
+        return stats
 
-    def all(self, cls=None):
+    def all(self, cls=None, **criteria):
         """Query objects from the database.
 
         Args:
             cls (str or SQLAlchemy class, optional): Class to query.
                 Defaults to None, which retrieves all objects from all classes.
+            **criteria: filters, see models.engine.criteria. Without cls,
+                only the classes having every filtered column are queried.
 
         Returns:
-            dict: A dictionary of objects with format '{ClassName}.{object_id}'.
+            dict: A dictionary of objects with format
+                '{ClassName}.{object_id}'.
         """
-        if cls is None:
-            objs = []
-            for model in [State, City, User, Place, Review, Amenity]:
-                objs.extend(self.__session.query(model).all())
-        elif isinstance(cls, str):
-            cls = eval(cls)
-            objs = self.__session.query(cls).all()
-        else:
-            objs = self.__session.query(cls).all()
+        objs = []
+        for query in self.__queries(cls, criteria):
+            objs.extend(query.all())
 
         return {"{}.{}".format(type(o).__name__, o.id): o for o in objs}
 
+    def iter(self, cls, batch_size=1000, after_id=None, **criteria):
+        """Yield the objects of cls in id order, batch_size at a time.
+
+        Each batch is read by a keyset query (WHERE id > last id ORDER
+        BY id LIMIT batch_size), so no OFFSET is scanned and only one
+        batch is held at a time: the session only keeps weak references
+        to unchanged objects. No cursor stays open between batches, so
+        the caller may save() while iterating.
+
+        Args:
+            cls (str or class): the class of the objects.
+            batch_size (int): number of objects read per query.
+            after_id (str, optional): only yield the objects whose id
+                sorts after it.
+            **criteria: filters, see models.engine.criteria.
+        """
+        if isinstance(cls, str):
+            cls = eval(cls)
+        query, = self.__queries(cls, criteria)
+        query = query.order_by(cls.id)
+        while True:
+            page = query
+            if after_id is not None:
+                page = page.filter(cls.id > after_id)
+            batch = page.limit(batch_size).all()
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after_id = batch[-1].id
+
+    def __queries(self, cls, criteria):
+        """Return the queries of cls, or of each class, with criteria."""
+        if isinstance(cls, str):
+            cls = eval(cls)
+        classes = [cls] if cls else self.__models
+        conditions = parse(criteria)
+        queries = []
+        for model in classes:
+            query = self.__session.query(model)
+            for attr, op, value in conditions:
+                column = getattr(model, attr, None)
+                if column is None and cls is None:
+                    break
+                if column is None:
+                    raise AttributeError("{} has no column {}".format(
+                        model.__name__, attr))
+                if op == "in":
+                    query = query.filter(column.in_(value))
+                else:
+                    query = query.filter(OPERATORS[op](column, value))
+            else:
+                queries.append(query)
+        return queries
+
     def new(self, obj):
         """Add a new object to the current database session.
 
         Args:
             obj (BaseModel): The object to add to the session.
         """
+        self.__session().primary = True
         self.__session.add(obj)
+        self.__invalidate([obj])
+
+    def bulk_new(self, objs):
+        """Add objs to the database, committing them in chunks.
+
+        The ORM inserts the objects of each chunk with one batched
+        INSERT per table.
+        """
+        for chunk in self.__chunks(objs):
+            self.__session.add_all(chunk)
+            self.save()
+
+    def bulk_update(self, objs, **attrs):
+        """Set attrs and updated_at on objs, committing them in chunks.
+
+        Objects whose changed columns are the same are updated with one
+        executemany UPDATE.
+        """
+        now = datetime.utcnow()
+        for chunk in self.__chunks(objs):
+            for obj in chunk:
+                for name, value in attrs.items():
+                    setattr(obj, name, value)
+                obj.updated_at = now
+            self.__session.add_all(chunk)
+            self.save()
+
+    def bulk_delete(self, objs):
+        """Delete objs from the database, committing them in chunks.
+
+        The relationships cascading the delete are prefetched first, so
+        the children of a chunk are loaded with one query per
+        relationship instead of one per object.
+        """
+        for chunk in self.__chunks(objs):
+            classes = {}
+            for obj in chunk:
+                classes.setdefault(type(obj), []).append(obj)
+            for cls, cls_objs in classes.items():
+                paths = [rel.key for rel in inspect(cls).relationships
+                         if rel.cascade.delete or rel.secondary is not None]
+                if paths:
+                    self.prefetch(cls_objs, *paths)
+            for obj in chunk:
+                self.__session.delete(obj)
+            self.save()
+
+    def __chunks(self, objs):
+        """Yield lists of at most __chunk_size objects of objs."""
+        objs = iter(objs)
+        chunk = list(islice(objs, self.__chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(objs, self.__chunk_size))
 
     def get(self, cls, id):
-        """Retrieve an object based on class and ID"""
-        key = "{}.{}".format(cls.__name__, id)
-        return self.all(cls).get(key, None)
+        """Retrieve an object based on class and ID
 
-    def count(self, cls=None):
-        """Count the number of objects in storage"""
-        if cls:
-            return self.__session.query(cls).count()
-        return sum(self.__session.query(model).count()
-                   for model in [State, City, User, Place, Review, Amenity])
+        The object is looked up by primary key. With the cache enabled,
+        a cached copy is attached to the current session without a query.
+        """
+        if isinstance(cls, str):
+            cls = eval(cls)
+        if self.__cache is not None:
+            obj = self.__cache.get((cls, id))
+            if obj is not None and not inspect(obj).modified:
+                return self.__session.merge(obj, load=False)
+        obj = self.__session.get(cls, id)
+        if obj is not None and self.__cache is not None:
+            self.__cache.put((cls, id), obj)
+        return obj
+
+    def prefetch(self, objects, *paths):
+        """Load the objects related to objects along dotted paths.
+
+        Each path, such as "cities.places.amenities", is loaded with
+        one SELECT ... WHERE id IN (...) for the objects of each class
+        and one per relationship of the path, instead of one SELECT per
+        object when the relationships are walked lazily.
+
+        Args:
+            objects (iterable): the objects to start from.
+            *paths (str): relationship paths.
+
+        Returns:
+            list: objects.
+        """
+        objects = list(objects)
+        ids = {}
+        for obj in objects:
+            ids.setdefault(type(obj), []).append(obj.id)
+        for cls, cls_ids in ids.items():
+            options = []
+            for path in paths:
+                option, model = None, cls
+                for attr in path.split("."):
+                    column = getattr(model, attr)
+                    option = selectinload(column) if option is None \
+                        else option.selectinload(column)
+                    model = column.property.mapper.class_
+                options.append(option)
+            self.__session.query(cls).filter(
+                cls.id.in_(cls_ids)).options(*options).all()
+        return objects
+
+    def cache_stats(self):
+        """Return the hit/miss statistics of the get() cache.
+
+        Returns:
+            dict: see ObjectCache.stats(), or None without a cache.
+        """
+        if self.__cache is None:
+            return None
+        return self.__cache.stats()
+
+    def __invalidate(self, objs=None):
+        """Drop objs, or the session's changed objects, from the cache."""
+        if self.__cache is None:
+            return
+        if objs is None:
+            session = self.__session
+            objs = list(session.new) + list(session.dirty) + \
+                list(session.deleted)
+        for obj in objs:
+            self.__cache.invalidate((type(obj), obj.id))
+
+    def count(self, cls=None, **criteria):
+        """Count the number of objects in storage
+
+        With criteria, only the rows matching them are counted.
+        """
+        return sum(query.count()
+                   for query in self.__queries(cls, criteria))
+
+    def counts(self, *classes):
+        """Return the number of objects of each class.
+
+        Args:
+            *classes (str or class): the classes to count. Defaults to
+                every class.
+
+        Returns:
+            dict: the number of objects, keyed by class.
+        """
+        classes = [eval(cls) if isinstance(cls, str) else cls
+                   for cls in classes] or self.__models
+        with self.__counts_lock:
+            if self.__counts is None or \
+                    time.monotonic() - self.__counts_at > self.__counts_ttl:
+                self.__counts_at = time.monotonic()
+                self.__counts = self.__count_all()
+            return {cls: self.__counts.get(cls, 0) for cls in classes}
+
+    def __count_all(self):
+        """Count the committed rows of every class in one query.
+
+        The rows flushed but not yet committed by the current session
+        are left out, since __committed() adds them once committed.
+        """
+        names = {cls.__name__: cls for cls in self.__models}
+        query = union_all(*[
+            select(literal(cls.__name__), func.count()).select_from(cls)
+            for cls in self.__models])
+        rows = self.__session.execute(query).all()
+        pending = self.__session.info.get("counts", {})
+        return {names[name]: count - pending.get(names[name], 0)
+                for name, count in rows}
+
+    def __flushed(self, session, flush_context):
+        """Record the objects added or deleted by a flush of session."""
+        deltas = session.info.setdefault("counts", {})
+        for obj in session.new:
+            deltas[type(obj)] = deltas.get(type(obj), 0) + 1
+        for obj in session.deleted:
+            deltas[type(obj)] = deltas.get(type(obj), 0) - 1
+
+    def __committed(self, session):
+        """Apply the counts recorded by the flushes of session."""
+        deltas = session.info.pop("counts", {})
+        with self.__counts_lock:
+            if self.__counts is not None:
+                for cls, delta in deltas.items():
+                    self.__counts[cls] = self.__counts.get(cls, 0) + delta
+
+    def __rolled_back(self, session):
+        """Drop the counts recorded by the flushes of session."""
+        session.info.pop("counts", None)
 
     def save(self):
-        """Commit changes to the current database session."""
+        """Commit changes to the current database session.
+
+        Inside a transaction() the changes are only flushed, and are
+        committed when the transaction ends.
+        """
+        self.__session().primary = True
+        self.__invalidate()
+        if getattr(self.__local, "active", False):
+            self.__session.flush()
+            return
         self.__session.commit()
 
+    @contextmanager
+    def transaction(self):
+        """Commit the changes made in the block once, or roll them back.
+
+        Nested transactions are part of the outermost one.
+        """
+        if getattr(self.__local, "active", False):
+            yield
+            return
+        self.__local.active = True
+        self.__session().primary = True
+        try:
+            yield
+        except BaseException:
+            if self.__cache is not None:
+                self.__cache.clear()
+            self.__session.rollback()
+            raise
+        else:
+            self.__invalidate()
+            self.__session.commit()
+        finally:
+            self.__local.active = False
+
     def delete(self, obj=None):
         """Delete an object from the database session.
 
@@ -107,14 +513,40 @@ class DBStorage:
             obj (BaseModel, optional): The object to delete from the session.
         """
         if obj is not None:
+            self.__session().primary = True
             self.__session.delete(obj)
+            self.__invalidate([obj])
 
     def reload(self):
-        """Create all tables in the database and create a new session."""
+        """Create all tables in the database and create a new session.
+
+        A database without tables is stamped with the latest migration,
+        as create_all() already gives it the current schema.
+        """
+        fresh = not inspect(self.__engine).has_table(State.__tablename__)
         Base.metadata.create_all(self.__engine)
+        if fresh:
+            migrations.stamp(self.__engine)
         session_factory = sessionmaker(
-            bind=self.__engine, expire_on_commit=False)
+            bind=self.__engine, class_=RoutingSession,
+            replicas=self.__replicas, expire_on_commit=False)
+        event.listen(session_factory, "after_flush", self.__flushed)
+        event.listen(session_factory, "after_commit", self.__committed)
+        event.listen(session_factory, "after_rollback", self.__rolled_back)
         self.__session = scoped_session(session_factory)
+        self.__counts = None
+
+    def migrate(self, target=None):
+        """Apply the schema migrations not applied yet, up to target.
+
+        Returns:
+            list: the versions applied.
+        """
+        return migrations.upgrade(self.__engine, target)
+
+    def schema_version(self):
+        """Return the version of the last migration applied."""
+        return migrations.current(self.__engine)
 
     def close(self):
         """Close the current session."""
@@ -127,9 +559,3 @@ class DBStorage:
                 bind=self.__engine, expire_on_commit=False)
             self.__session = scoped_session(session_factory)
         return self.__session()
-
-
-# Create an instance of DBStorage
-storage = DBStorage()
-# Load the data from the database
-storage.reload()
@@ -1,9 +1,83 @@
 #!/usr/bin/python3
 """Module containing FileStorage class definition.
+
+Setting HBNB_FILE_JOURNAL=1 makes FileStorage append each saved change
+to a journal next to the snapshot instead of rewriting the whole file;
+HBNB_FILE_JOURNAL_MAX sets how many journal records trigger a compaction.
+
+Setting HBNB_FILE_SHARDS=N splits the snapshot into one file per class
+and per N buckets of object ids (file.<Class>.<bucket>.json); save() then
+only rewrites the shards holding changed objects and reload() reads the
+shards in parallel.
+
+Setting HBNB_FILE_FORMAT=binary stores the snapshot in file.hbnb using
+the format of models.engine.binary_format instead of JSON. With the binary
+format, HBNB_FILE_LAZY=1 memory-maps the snapshot and only instantiates
+objects when they are looked up, keeping at most HBNB_FILE_LAZY_CACHE of
+them in memory.
+
+Snapshots are written to a temp file, synced and renamed over the old
+one, and journal appends are synced, unless HBNB_FILE_FSYNC=0. Concurrent
+save() calls are grouped into a single write; HBNB_FILE_COMMIT_WINDOW
+sets how many seconds a write waits for more saves to join it.
+
+Setting HBNB_FILE_WRITE_BEHIND=1 makes save() return without writing;
+a background thread writes the changes once the oldest of them is
+HBNB_FILE_FLUSH_INTERVAL seconds old, once HBNB_FILE_FLUSH_THRESHOLD
+objects changed, when flush() is called and when the process exits.
+durability_lag() tells how long the unwritten changes have waited.
+
+close() only reads the files again when their inode, mtime or size
+changed since this process last read or wrote them, and then only
+applies the changed shards, the new journal records or the objects whose
+updated_at differs.
+
+Setting HBNB_FILE_MULTIPROCESS=1 lets several processes share the files.
+Writers take an exclusive lock on file.json.lock (file.hbnb.lock),
+apply the changes other processes made, write, and bump the store
+version kept in the lock file. close() takes a shared lock and only
+looks at the files when the version moved.
+
+all() returns a snapshot of the store that later writes do not modify,
+so readers can iterate over it without locks while other threads write.
+The snapshot is copied once per change and shared until the next one;
+a reload is published as a whole once it is done.
+
+transaction() groups the changes of a block: they are written by a
+single save() when the block exits, or undone if it raises.
+bulk_new(), bulk_update() and bulk_delete() also write their objects
+with a single save().
+
+all() and count() accept the criteria of models.engine.criteria; an
+equality or __in criterion on an indexed foreign key is answered from
+the reverse indexes instead of scanning the class.
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+import atexit
+import copy
+import bisect
+from datetime import datetime
+import glob
+import heapq
+import itertools
 import json
-from models.base_model import BaseModel
+import mmap
+import os
+from os import getenv
+import re
+import threading
+import time
+import zlib
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from models.base_model import BaseModel, UNSET, time_format
+from models.engine import binary_format
+from models.engine.criteria import matches, parse
 from models.amenity import Amenity
 from models.city import City
 from models.place import Place
@@ -16,75 +90,1350 @@ class FileStorage:
     """Represents a storage engine structured as key/value pairs.
 
     Attributes:
+    __format (str): snapshot format, "json" or "binary".
     __file_path (str): name of the file used in saving objects to dicts.
     __objects (dict): dictionary of instantiated objects.
+    __classes (dict): per-class buckets of __objects, keyed by class,
+        so lookups by class never scan unrelated objects.
+    __foreign_keys (dict): attributes indexed for each class, mapping
+        a class to the names of its foreign key attributes.
+    __relations (dict): reverse indexes keyed by (class, attribute, value),
+        each holding the objects whose attribute holds that value.
+    __links (dict): the (class, attribute, value) entries of each key,
+        used to drop stale index entries when an attribute changes.
+    __dirty (dict): keys changed since the last save, mapped to the
+        object to write or to None when the object was deleted.
+    __fragments (dict): cached '"key": {...}' JSON encoding, or binary
+        record, of each object that has not changed since it was last
+        written.
+    __edits (dict): key -> sequence number of its last change, so that
+        a fragment encoded while its object changed is not cached.
+    __edit_numbers (itertools.count): the sequence numbers of __edits.
+    __names (NameTable): names interned by the binary records.
+    __journal (bool): whether save() appends to the journal.
+    __journal_path (str): name of the append-only journal file.
+    __journal_max (int): number of journal records that triggers
+        a compaction into a new snapshot.
+    __journal_records (int): number of records in the journal.
+    __chunk_size (int): number of characters read at a time by reload().
+    __shards (int): number of id buckets per class, or 0 to keep every
+        object in __file_path.
+    __lazy (bool): whether reload() maps binary snapshots and leaves
+        their objects unloaded until they are looked up.
+    __lazy_max (int): number of loaded objects kept by the lazy mode.
+    __maps (list): the snapshot files mapped by the lazy mode.
+    __unloaded (dict): class name -> {key: record} of the objects that
+        are on disk but not instantiated.
+    __cached (OrderedDict): key -> record of the instantiated objects
+        that still match their record, least recently used first.
+    __fsync (bool): whether writes are synced to disk before returning.
+    __commit_window (float): seconds a write waits for saves to join it.
+    __commit (threading.Condition): guards the group commit counters.
+    __requested (int): number of save() calls so far.
+    __committed (int): number of save() calls covered by a write.
+    __committing (bool): whether a save() is currently writing.
+    __write_lock (threading.RLock): serializes the physical writes.
+    __write_behind (bool): whether save() leaves the writes to the
+        background flusher.
+    __flush_interval (float): age in seconds of the oldest unwritten
+        change that triggers a background flush.
+    __flush_threshold (int): number of changed objects that triggers
+        a background flush.
+    __behind (threading.Condition): wakes up the background flusher.
+    __pending_since (float): time.monotonic() of the oldest unwritten
+        save(), or None when every save() was written.
+    __writing_since (float): __pending_since of the write in progress.
+    __generation (dict): path -> (inode, mtime, size) of the snapshot
+        and journal files when this process last read or wrote them.
+    __journal_offset (int): size of the journal already applied.
+    __multiprocess (bool): whether writes are coordinated with other
+        processes through the lock file.
+    __version (int): store version of the files last read or written.
+    __lock_file (file): the lock file while this process holds it.
+    __lock_shared (bool): whether __lock_file is locked shared.
+    __relayout_pending (bool): whether files read under the shared lock
+        are to be rewritten in the current layout once it is released.
+    __mutations (int): number of changes made to __objects.
+    __views (dict): class (None for every class) -> (mutations, dict)
+        snapshot last returned by all().
+    __batching (int): number of reloads in progress, during which all()
+        keeps returning the snapshots taken before them.
+    __published (int): __mutations after the last change made by a
+        thread outside of the batches in progress; snapshots older than
+        it are not kept.
+    __sorted (dict): class name -> sorted ids of its objects, loaded or
+        not, used by iter(); built when first needed and dropped when a
+        batch ends.
+    __views_lock (threading.Lock): guards __mutations, __batching,
+        __published and __sorted.
+    __local (threading.local): the transaction of each thread, as
+        "undo" (key -> object stored before the transaction, or None)
+        and "attrs" (key -> attributes before the transaction), and
+        "batching", the number of batches the thread is running.
+    __flusher (threading.Thread): the background flusher, once started.
+    __stopping (bool): whether the background flusher must exit.
+    __exit_hook (bool): whether __stop() is registered to run at exit.
     """
-    __file_path = "file.json"
+    __format = getenv("HBNB_FILE_FORMAT", "json")
+    __file_path = "file.hbnb" if __format == "binary" else "file.json"
+    __journal = getenv("HBNB_FILE_JOURNAL") == "1"
+    __journal_path = __file_path + ".journal"
+    __journal_max = int(getenv("HBNB_FILE_JOURNAL_MAX", "1000"))
+    __journal_records = 0
+    __chunk_size = 1 << 20
+    __shards = int(getenv("HBNB_FILE_SHARDS", "0"))
+    __lazy = getenv("HBNB_FILE_LAZY") == "1" and __format == "binary"
+    __lazy_max = int(getenv("HBNB_FILE_LAZY_CACHE", "10000"))
+    __maps = []
+    __unloaded = {}
+    __cached = OrderedDict()
+    __fsync = getenv("HBNB_FILE_FSYNC", "1") != "0"
+    __commit_window = float(getenv("HBNB_FILE_COMMIT_WINDOW", "0"))
+    __commit = threading.Condition()
+    __requested = 0
+    __committed = 0
+    __committing = False
+    __write_lock = threading.RLock()
+    __write_behind = getenv("HBNB_FILE_WRITE_BEHIND") == "1"
+    __flush_interval = float(getenv("HBNB_FILE_FLUSH_INTERVAL", "1"))
+    __flush_threshold = int(getenv("HBNB_FILE_FLUSH_THRESHOLD", "1000"))
+    __behind = threading.Condition()
+    __pending_since = None
+    __writing_since = None
+    __generation = {}
+    __journal_offset = 0
+    __multiprocess = getenv("HBNB_FILE_MULTIPROCESS") == "1" and \
+        fcntl is not None
+    __version = 0
+    __lock_file = None
+    __lock_shared = False
+    __relayout_pending = False
+    __mutations = 0
+    __views = {}
+    __batching = 0
+    __published = 0
+    __sorted = {}
+    __local = threading.local()
+    __views_lock = threading.Lock()
+    __flusher = None
+    __stopping = False
+    __exit_hook = False
     __objects = {}
+    __classes = {}
+    __foreign_keys = {
+        City: ("state_id",),
+        Place: ("city_id", "user_id", "amenity_ids"),
+        Review: ("place_id", "user_id"),
+    }
+    __relations = {}
+    __links = {}
+    __dirty = {}
+    __fragments = {}
+    __edits = {}
+    __edit_numbers = itertools.count(1)
+    __names = binary_format.NameTable()
 
     def __init__(self):
         """FileStorage instance initialization."""
         self.reload()
 
-    def all(self, cls=None):
+    def all(self, cls=None, **criteria):
         """Returns a dictionary of instantiated objects in __objects.
 
         If a cls is specified, a dictionary of objects of that type
-        is returned. Otherwise, returns the __objects dictionary.
+        is returned. Otherwise, returns every object.
+        Objects left unloaded by the lazy mode are loaded first, and
+        kept loaded so that changes to them are tracked.
+
+        The dictionary is a snapshot shared between callers: it is not
+        modified by later writes and must not be modified by callers.
+
+        With criteria (see models.engine.criteria), only the matching
+        objects are returned, in a new dictionary.
         """
+        if criteria:
+            return self.__select(cls, parse(criteria))
         if cls:
-            if isinstance(cls, str):
-                cls = eval(cls)
-            return {
-                key: value for key, value in self.__objects.items()
-                if isinstance(value, cls)}
+            unloaded = [bucket for bucket in
+                        self.__buckets(cls, self.__unloaded) if bucket]
+            if unloaded:
+                objs = {}
+                for bucket in self.__buckets(cls):
+                    objs.update(bucket)
+                for bucket in unloaded:
+                    for key, record in list(bucket.items()):
+                        objs[key] = self.__hydrate(key, record,
+                                                   evict=False)
+                return objs
+        else:
+            for bucket in list(self.__unloaded.values()):
+                for key, record in list(bucket.items()):
+                    self.__hydrate(key, record, evict=False)
+        return self.__view(cls or None)
+
+    def __select(self, cls, conditions):
+        """Return a dictionary of the objects of cls matching conditions.
+
+        The candidates of each class come from the reverse index of the
+        first equality or __in condition on one of its foreign keys, or
+        else from the whole class bucket.
+        """
+        if isinstance(cls, str):
+            cls = eval(cls)
+        for bucket in self.__buckets(cls or BaseModel, self.__unloaded):
+            for key, record in list(bucket.items()):
+                self.__hydrate(key, record, evict=False)
+        objs = {}
+        for klass, bucket in list(self.__classes.items()):
+            if cls and not issubclass(klass, cls):
+                continue
+            candidates = bucket
+            for attr, op, value in conditions:
+                values = [value] if op == "eq" else value
+                if op in ("eq", "in") and \
+                        attr in self.__foreign_keys.get(klass, ()) and \
+                        all(isinstance(v, str) for v in values):
+                    candidates = {}
+                    for v in values:
+                        candidates.update(
+                            self.__relations.get((klass, attr, v), {}))
+                    break
+            for key, obj in list(candidates.items()):
+                if matches(obj, conditions):
+                    objs[key] = obj
+        return objs
 
-        return self.__objects
+    def __view(self, cls):
+        """Return the snapshot of the objects of cls, or of every object.
+
+        dict.copy() and dict.update() run without releasing the GIL, so
+        the copies are taken without locks. A snapshot is reused until
+        __mutations moves, and kept while a reload is in progress unless
+        a thread outside of it changed an object.
+        """
+        if isinstance(cls, str):
+            cls = eval(cls)
+        mutations = self.__mutations
+        view = self.__views.get(cls)
+        if view is not None and (view[0] == mutations or (
+                self.__batching and view[0] >= self.__published)):
+            return view[1]
+        if cls is None:
+            objs = self.__objects.copy()
+        else:
+            objs = {}
+            for bucket in self.__buckets(cls):
+                objs.update(bucket)
+        self.__views[cls] = (mutations, objs)
+        return objs
+
+    def __mutated(self):
+        """Invalidate the snapshots returned by all().
+
+        A change made by a thread that is not running a batch is
+        published at once, even while other threads run one.
+        """
+        with self.__views_lock:
+            FileStorage.__mutations += 1
+            if not getattr(self.__local, "batching", 0):
+                FileStorage.__published = self.__mutations
+
+    @contextmanager
+    def __batch(self):
+        """Publish the changes made in the block to all() at once."""
+        with self.__views_lock:
+            FileStorage.__batching += 1
+        self.__local.batching = getattr(self.__local, "batching", 0) + 1
+        try:
+            yield
+        finally:
+            self.__local.batching -= 1
+            with self.__views_lock:
+                FileStorage.__batching -= 1
+                if not self.__local.batching:
+                    self.__sorted.clear()
+
+    def __buckets(self, cls, buckets=None):
+        """Yield the per-class buckets holding instances of cls.
+
+        buckets defaults to __classes; __unloaded, keyed by class name,
+        may be given instead.
+        """
+        if isinstance(cls, str):
+            cls = eval(cls)
+        if buckets is None:
+            buckets = self.__classes
+        for klass, bucket in list(buckets.items()):
+            if isinstance(klass, str):
+                klass = eval(klass)
+            if issubclass(klass, cls):
+                yield bucket
 
     def new(self, obj):
         """Set in __objects obj a key <obj_class_name>.id."""
         key = "{}.{}".format(type(obj).__name__, obj.id)
+        undo = getattr(self.__local, "undo", None)
+        if undo is not None and key not in undo:
+            undo[key] = self.__objects.get(key)
         self.__objects[key] = obj
+        self.__classes.setdefault(type(obj), {})[key] = obj
+        self.__mutated()
+        self.__order(key)
+        self.__link(key, obj)
+        self.__touch(key, obj)
+
+    def __order(self, key, add=True):
+        """Add the id of key to the sorted ids of its class, or remove it.
+
+        Nothing is done when they were not built, or in a batch, which
+        drops them when it ends.
+        """
+        name, _, id = key.partition(".")
+        with self.__views_lock:
+            ids = self.__sorted.get(name)
+            if ids is None or getattr(self.__local, "batching", 0):
+                return
+            i = bisect.bisect_left(ids, id)
+            found = i < len(ids) and ids[i] == id
+            if add and not found:
+                ids.insert(i, id)
+            elif not add and found:
+                del ids[i]
+
+    def __page(self, name, after_id, size):
+        """Return the first size ids of the class name after after_id.
+
+        The sorted ids of the class are built on the first call.
+        """
+        with self.__views_lock:
+            ids = self.__sorted.get(name)
+            if ids is None:
+                keys = set(self.__classes.get(eval(name), ()))
+                keys.update(self.__unloaded.get(name, ()))
+                ids = sorted(key.partition(".")[2] for key in keys)
+                if not getattr(self.__local, "batching", 0):
+                    self.__sorted[name] = ids
+            start = 0
+            if after_id is not None:
+                start = bisect.bisect_right(ids, after_id)
+            return ids[start:start + size]
+
+    def __keyset(self, name, after_id, size):
+        """Yield (id, name) for the objects of the class name in id
+        order, reading size ids at a time after the last one yielded."""
+        while True:
+            page = self.__page(name, after_id, size)
+            for id in page:
+                yield id, name
+            if len(page) < size:
+                return
+            after_id = page[-1]
+
+    def bulk_new(self, objs):
+        """Add every object of objs and save them with a single write."""
+        with self.__batch():
+            for obj in objs:
+                self.new(obj)
+        self.save()
+
+    def bulk_update(self, objs, **attrs):
+        """Set attrs and updated_at on objs and save them in one write."""
+        now = datetime.utcnow()
+        with self.__batch():
+            for obj in objs:
+                for name, value in attrs.items():
+                    setattr(obj, name, value)
+                obj.updated_at = now
+                self.new(obj)
+        self.save()
+
+    def bulk_delete(self, objs):
+        """Delete every object of objs and save with a single write."""
+        with self.__batch():
+            for obj in objs:
+                self.delete(obj)
+        self.save()
+
+    def __touch(self, key, obj):
+        """Record that key changed; obj is None when it was deleted."""
+        self.__dirty[key] = obj
+        self.__edits[key] = next(self.__edit_numbers)
+        self.__fragments.pop(key, None)
+        if self.__maps:
+            self.__forget(key)
+
+    def __forget(self, key):
+        """Drop the mapped record of key, which no longer matches it."""
+        self.__cached.pop(key, None)
+        self.__unloaded.get(key.partition(".")[0], {}).pop(key, None)
+
+    def __hydrate(self, key, record, evict=True):
+        """Instantiate the object of a mapped record and store it clean.
+
+        With evict, the least recently used objects that still match
+        their record are unloaded first to stay within __lazy_max.
+        """
+        while evict and len(self.__cached) >= self.__lazy_max:
+            old_key, old_record = self.__cached.popitem(last=False)
+            self.__remove(old_key)
+            self.__unloaded.setdefault(
+                old_key.partition(".")[0], {})[old_key] = old_record
+        (buffer, table, _), start, end = record
+        obj = self.__load(binary_format.decode(buffer[start + 4:end],
+                                               table)[1])
+        self.__cached[key] = record
+        return obj
+
+    def __link(self, key, obj):
+        """Index the foreign key attributes of obj under key."""
+        self.__unlink(key)
+        links = []
+        for attr in self.__foreign_keys.get(type(obj), ()):
+            values = getattr(obj, attr, None)
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            for value in values:
+                if isinstance(value, str):
+                    link = (type(obj), attr, value)
+                    self.__relations.setdefault(link, {})[key] = obj
+                    links.append(link)
+        if links:
+            self.__links[key] = links
+
+    def __unlink(self, key):
+        """Remove every reverse index entry recorded for key."""
+        for link in self.__links.pop(key, ()):
+            bucket = self.__relations.get(link, {})
+            bucket.pop(key, None)
+            if not bucket:
+                self.__relations.pop(link, None)
+
+    def changed(self, obj, attr, old=UNSET):
+        """Mark obj dirty and refresh its indexes after attr was set.
+
+        In a transaction, the attributes of obj are recorded the first
+        time one of them is set, with copies of its list and dict values
+        so that changes made to them in place can be undone too. Objects
+        added by the transaction are not recorded, as they are dropped
+        when it is rolled back.
+
+        Args:
+            obj (BaseModel): the object whose attribute was set.
+            attr (str): the name of the attribute.
+            old: the previous value of attr, or UNSET if it had none.
+        """
+        if "id" not in obj.__dict__:
+            return
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        if self.__objects.get(key) is not obj:
+            return
+        undo = getattr(self.__local, "undo", None)
+        if undo is not None and undo.get(key, obj) is not None:
+            attrs = self.__local.attrs
+            if key not in attrs:
+                attrs[key] = {
+                    name: copy.deepcopy(value)
+                    if isinstance(value, (list, dict)) else value
+                    for name, value in obj.__dict__.items()}
+                if old is UNSET:
+                    del attrs[key][attr]
+                else:
+                    attrs[key][attr] = old
+            undo.setdefault(key, obj)
+        self.__touch(key, obj)
+        if attr in self.__foreign_keys.get(type(obj), ()):
+            self.__link(key, obj)
+
+    def related(self, cls, attr, value):
+        """Returns a dictionary of cls objects whose attr holds value.
+
+        attr must be one of the foreign keys indexed for cls; list
+        attributes such as Place.amenity_ids match any of their items.
+        """
+        if isinstance(cls, str):
+            cls = eval(cls)
+        for bucket in self.__buckets(cls, self.__unloaded):
+            for key, record in list(bucket.items()):
+                self.__hydrate(key, record, evict=False)
+        return dict(self.__relations.get((cls, attr, value), {}))
+
+    def prefetch(self, objects, *paths):
+        """Load the objects related to objects along dotted paths.
+
+        The relationships of FileStorage are answered by the reverse
+        indexes, so this only walks each path once, loading the objects
+        left unloaded by the lazy mode. Objects lacking an attribute
+        of the path are skipped.
+
+        Args:
+            objects (iterable): the objects to start from.
+            *paths (str): attribute paths such as "cities.places".
+
+        Returns:
+            list: objects.
+        """
+        objects = list(objects)
+        for path in paths:
+            level = objects
+            for attr in path.split("."):
+                related = []
+                for obj in level:
+                    value = getattr(obj, attr, None)
+                    if isinstance(value, list):
+                        related.extend(value)
+                    elif value is not None:
+                        related.append(value)
+                level = related
+        return objects
 
     def save(self):
-        """Serializes __objects to the JSON file's __file_path."""
-        objects_dict = {
-            key: value.to_dict() for key,
-            value in self.__objects.items()
-        }
-        with open(self.__file_path, "w", encoding="utf-8") as file:
-            json.dump(objects_dict, file)
-
-    def reload(self):
+        """Serializes __objects to the JSON file's __file_path.
+
+        In journal mode only the changes since the last save are appended
+        to __journal_path, and the snapshot is rewritten once the journal
+        holds __journal_max records. In sharded mode only the shards
+        holding changed objects are rewritten.
+
+        In write-behind mode the changes are only written by the
+        background flusher, see flush().
+        """
+        if getattr(self.__local, "undo", None) is not None:
+            return
+        if not self.__write_behind:
+            self.flush()
+            return
+        with self.__behind:
+            if self.__pending_since is None:
+                FileStorage.__pending_since = time.monotonic()
+            if self.__flusher is None:
+                FileStorage.__flusher = threading.Thread(
+                    target=self.__flush_behind, name="FileStorage flusher",
+                    daemon=True)
+                self.__flusher.start()
+                if not self.__exit_hook:
+                    atexit.register(self.__stop)
+                    FileStorage.__exit_hook = True
+            if len(self.__dirty) >= self.__flush_threshold:
+                self.__behind.notify_all()
+
+    @contextmanager
+    def transaction(self):
+        """Group the changes made by this thread in the block.
+
+        save() calls made in the block are deferred, and the changes are
+        saved once when the block exits. If the block raises, the objects
+        added, deleted or changed in it are restored and nothing is
+        written. Other threads cannot write the files during the block.
+        Nested transactions are part of the outermost one.
+        """
+        if getattr(self.__local, "undo", None) is not None:
+            yield
+            return
+        with self.__write_lock:
+            dirty = set(self.__dirty)
+            self.__local.undo = {}
+            self.__local.attrs = {}
+            try:
+                yield
+            except BaseException:
+                self.__rollback(dirty)
+                raise
+            finally:
+                undo = self.__local.undo
+                self.__local.undo = self.__local.attrs = None
+        if undo:
+            self.save()
+
+    def __rollback(self, dirty):
+        """Restore the objects changed by the current transaction.
+
+        Args:
+            dirty (set): the keys that were dirty when it began.
+        """
+        for key, attrs in self.__local.attrs.items():
+            obj = self.__local.undo[key]
+            obj.__dict__.clear()
+            obj.__dict__.update(attrs)
+        undo, self.__local.undo = self.__local.undo, None
+        for key, obj in undo.items():
+            self.__remove(key)
+            if obj is not None:
+                self.new(obj)
+            else:
+                self.__order(key, False)
+            if key not in dirty:
+                self.__dirty.pop(key, None)
+
+    def flush(self):
+        """Write the changes made since the last write.
+
+        Calls made while another thread is writing wait for it, and the
+        first of them then writes once for all of them (group commit).
+        """
+        with self.__commit:
+            FileStorage.__requested += 1
+            ticket = self.__requested
+            while self.__committing:
+                self.__commit.wait()
+            if self.__committed >= ticket:
+                return
+            FileStorage.__committing = True
+        batch = None
+        with self.__behind:
+            FileStorage.__writing_since = self.__pending_since
+            FileStorage.__pending_since = None
+        try:
+            if self.__commit_window:
+                time.sleep(self.__commit_window)
+            with self.__commit:
+                batch = self.__requested
+            self.__persist()
+        except BaseException:
+            batch = None
+            with self.__behind:
+                if self.__writing_since is not None:
+                    FileStorage.__pending_since = self.__writing_since
+            raise
+        finally:
+            FileStorage.__writing_since = None
+            with self.__commit:
+                if batch is not None:
+                    FileStorage.__committed = batch
+                FileStorage.__committing = False
+                self.__commit.notify_all()
+
+    def durability_lag(self):
+        """Return how many seconds the oldest unwritten save() has waited.
+
+        Returns:
+            float: 0.0 when every save() was written to disk.
+        """
+        since = [t for t in (self.__writing_since, self.__pending_since)
+                 if t is not None]
+        if not since:
+            return 0.0
+        return time.monotonic() - min(since)
+
+    def __flush_behind(self):
+        """Run the background flusher until __stop() is called."""
+        while True:
+            with self.__behind:
+                while not self.__stopping:
+                    timeout = None
+                    if self.__pending_since is not None:
+                        timeout = (self.__pending_since +
+                                   self.__flush_interval - time.monotonic())
+                        if timeout <= 0 or \
+                                len(self.__dirty) >= self.__flush_threshold:
+                            break
+                    self.__behind.wait(timeout)
+                if self.__stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.__flush_interval)
+
+    def __stop(self):
+        """Stop the background flusher and write what it left."""
+        with self.__behind:
+            flusher = self.__flusher
+            FileStorage.__stopping = True
+            self.__behind.notify_all()
+        if flusher is not None:
+            flusher.join()
+        with self.__behind:
+            FileStorage.__flusher = None
+            FileStorage.__stopping = False
+        if self.__pending_since is not None:
+            self.flush()
+
+    def __persist(self):
+        """Write the changes made since the last save."""
+        with self.__writing():
+            if self.__journal:
+                self.__append()
+            elif self.__shards:
+                dirty = self.__take_dirty()
+                try:
+                    self.__write_shards({self.__shard(key) for key in dirty})
+                except BaseException:
+                    self.__restore_dirty(dirty)
+                    raise
+            else:
+                self.__compact()
+
+    @contextmanager
+    def __writing(self):
+        """Hold the write locks while the files are written.
+
+        In multi-process mode the lock file is locked exclusively and the
+        changes of the other processes are applied first, so that they
+        are not overwritten; the store version is bumped afterwards. The
+        files are stat'ed before the lock is released, as a write landing
+        in between would otherwise be taken as already read.
+        """
+        with self.__write_lock:
+            if not self.__multiprocess:
+                yield
+                FileStorage.__generation = self.__stat()
+            elif self.__lock_file is not None:
+                # Held exclusively by the write that is catching up,
+                # which bumps the version; nothing is written under the
+                # shared lock, see __reload()
+                yield
+                FileStorage.__generation = self.__stat()
+            else:
+                with self.__locked(fcntl.LOCK_EX) as lock:
+                    self.__catch_up()
+                    yield
+                    FileStorage.__generation = self.__stat()
+                    FileStorage.__version = self.__read_version(lock) + 1
+                    lock.truncate(0)
+                    lock.write(str(self.__version).encode())
+                    self.__sync(lock)
+
+    @contextmanager
+    def __locked(self, operation):
+        """Open the lock file and lock it with the flock operation."""
+        with open(self.__file_path + ".lock", "a+b") as lock:
+            fcntl.flock(lock, operation)
+            FileStorage.__lock_file = lock
+            FileStorage.__lock_shared = operation == fcntl.LOCK_SH
+            try:
+                yield lock
+            finally:
+                FileStorage.__lock_file = None
+                FileStorage.__lock_shared = False
+
+    def __read_version(self, lock):
+        """Return the store version kept in the lock file."""
+        lock.seek(0)
+        return int(lock.read() or 0)
+
+    def __take_dirty(self):
+        """Return the changes to write and start tracking new ones."""
+        dirty = self.__dirty
+        FileStorage.__dirty = {}
+        return dirty
+
+    def __restore_dirty(self, dirty):
+        """Track again the changes of a write that failed."""
+        for key, obj in dirty.items():
+            self.__dirty.setdefault(key, obj)
+
+    def __append(self):
+        """Append the changes since the last save to the journal."""
+        if not self.__dirty:
+            return
+        dirty = self.__take_dirty()
+        try:
+            records = []
+            for key, obj in dirty.items():
+                if obj is None:
+                    records.append({"op": "delete", "key": key})
+                else:
+                    records.append({"op": "upsert", "key": key,
+                                    "obj": obj.to_dict()})
+            with open(self.__journal_path, "a", encoding="utf-8") as file:
+                file.write("".join(json.dumps(record) + "\n"
+                                   for record in records))
+                self.__sync(file)
+                FileStorage.__journal_offset = file.tell()
+        except BaseException:
+            self.__restore_dirty(dirty)
+            raise
+        FileStorage.__journal_records += len(records)
+        if self.__journal_records >= self.__journal_max:
+            self.__compact()
+
+    def compact(self):
+        """Writes every object to the snapshot and empties the journal.
+
+        Objects are marked dirty when one of their attributes is set or
+        when they are passed to new(); every other object is written from
+        its cached JSON fragment instead of being encoded again.
+        """
+        with self.__writing():
+            self.__compact()
+
+    def __compact(self):
+        """Write the snapshot and remove the journal, see compact()."""
+        dirty = self.__take_dirty()
+        try:
+            if self.__shards:
+                written = self.__write_shards(None)
+                self.__prune(written)
+            else:
+                fragments = [self.__fragment(key, obj) for key, obj
+                             in list(self.__objects.items())]
+                for bucket in list(self.__unloaded.values()):
+                    fragments.extend(self.__raw(key, record) for
+                                     key, record in list(bucket.items()))
+                self.__write(self.__file_path, fragments)
+        except BaseException:
+            self.__restore_dirty(dirty)
+            raise
+        if self.__journal_records or \
+                os.path.exists(self.__journal_path):
+            os.remove(self.__journal_path)
+            FileStorage.__journal_records = 0
+            FileStorage.__journal_offset = 0
+
+    def __fragment(self, key, obj):
+        """Return the cached fragment of obj, encoding it if needed.
+
+        A fragment is only cached if obj did not change while it was
+        encoded, as another thread may have set one of its attributes.
+        """
+        if key in self.__cached:
+            return self.__raw(key, self.__cached[key])
+        fragment = self.__fragments.get(key)
+        if fragment is None:
+            edit = self.__edits.get(key)
+            obj_dict = obj.to_dict()
+            if self.__format == "binary":
+                for name in ("created_at", "updated_at"):
+                    if isinstance(obj.__dict__.get(name), datetime):
+                        obj_dict[name] = obj.__dict__[name]
+                fragment = binary_format.encode(key, obj_dict, self.__names)
+            else:
+                fragment = "{}: {}".format(
+                    json.dumps(key), json.dumps(obj_dict))
+            # __touch() numbers the change before it drops the fragment
+            self.__fragments[key] = fragment
+            if self.__edits.get(key) != edit:
+                self.__fragments.pop(key, None)
+        return fragment
+
+    def __raw(self, key, record):
+        """Return the binary record of key copied from its mapped file.
+
+        Records of a file whose name table differs from __names are
+        decoded and encoded again.
+        """
+        (buffer, table, same_names), start, end = record
+        if same_names:
+            return buffer[start:end]
+        obj_dict = binary_format.decode(buffer[start + 4:end], table)[1]
+        return binary_format.encode(key, obj_dict, self.__names)
+
+    def __write(self, path, fragments):
+        """Write the snapshot made of fragments to path.
+
+        The snapshot is written and synced next to path, then renamed over
+        it, so a crash leaves either the old or the new file and a file
+        mapped by the lazy mode is never modified in place.
+        """
+        tmp_path = path + ".tmp"
+        try:
+            if self.__format == "binary":
+                with open(tmp_path, "wb") as file:
+                    binary_format.dump(fragments, self.__names, file)
+                    self.__sync(file)
+            else:
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    file.write("{" + ", ".join(fragments) + "}")
+                    self.__sync(file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.__fsync:
+            try:
+                fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+            except OSError:
+                return
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+    def __sync(self, file):
+        """Flush file and sync it to disk unless __fsync is off."""
+        file.flush()
+        if self.__fsync:
+            os.fsync(file.fileno())
+
+    def __snapshot(self, path, progress=None):
+        """Yield the (key, attributes) pairs of the snapshot at path."""
+        if self.__format == "binary":
+            with open(path, "rb") as file:
+                yield from binary_format.load(file, progress)
+        else:
+            with open(path, "r", encoding="utf-8") as file:
+                yield from self.__members(file, progress)
+
+    def __shard(self, key):
+        """Return the (class name, bucket) shard that key belongs to."""
+        class_name, _, obj_id = key.partition(".")
+        return class_name, zlib.crc32(obj_id.encode()) % self.__shards
+
+    def __shard_path(self, shard):
+        """Return the file name of a (class name, bucket) shard."""
+        root, ext = os.path.splitext(self.__file_path)
+        return "{}.{}.{}{}".format(root, shard[0], shard[1], ext)
+
+    def __shard_paths(self):
+        """Return the shard files that exist next to __file_path."""
+        root, ext = os.path.splitext(self.__file_path)
+        pattern = re.compile(re.escape(root) + r"\.\w+\.\d+" +
+                             re.escape(ext) + "$")
+        return sorted(path for path in
+                      glob.glob(glob.escape(root) + ".*.*" + ext)
+                      if pattern.match(path))
+
+    def __write_shards(self, shards):
+        """Rewrite the given shards, or every non-empty one if None.
+
+        Returns:
+            set: The paths of the shard files written.
+        """
+        groups = {} if shards is None else {shard: [] for shard in shards}
+        names = {name for name, _ in groups}
+        buckets = [(klass.__name__, bucket, self.__fragment)
+                   for klass, bucket in list(self.__classes.items())]
+        buckets.extend((name, bucket, self.__raw)
+                       for name, bucket in list(self.__unloaded.items()))
+        for name, bucket, fragment in buckets:
+            if shards is not None and name not in names:
+                continue
+            for key, value in bucket.items():
+                shard = self.__shard(key)
+                if shards is None:
+                    groups.setdefault(shard, [])
+                elif shard not in groups:
+                    continue
+                groups[shard].append(fragment(key, value))
+        for shard, fragments in groups.items():
+            self.__write(self.__shard_path(shard), fragments)
+        return {self.__shard_path(shard) for shard in groups}
+
+    def __prune(self, keep=()):
+        """Remove the snapshot files of other layouts than the current one."""
+        paths = self.__shard_paths()
+        if self.__shards:
+            paths.append(self.__file_path)
+        for path in paths:
+            if path not in keep and os.path.exists(path):
+                os.remove(path)
+
+    def reload(self, progress=None):
         """Deserializes the JSON file's __file_path to __objects,
-        if it exists."""
+        if it exists, then replays the journal on top of it.
+
+        The snapshot is parsed one object at a time and each object is
+        instantiated as soon as it is read, so the parsed JSON is never
+        held in memory as a whole. Shard files are parsed by a thread pool
+        and merged as each one completes. If the files on disk were written
+        with another HBNB_FILE_* layout, they are compacted into the
+        current one. Changes still waiting for the write-behind flusher
+        are written first. In multi-process mode the files are read
+        under a shared lock, so that no other process writes them
+        in the meantime.
+
+        Args:
+            progress (callable, optional): called as progress(done, total)
+                with the number of bytes read so far and the total size.
+        """
+        if self.__pending_since is not None:
+            self.flush()
+        if not self.__multiprocess:
+            self.__reload(progress)
+            return
+        with self.__write_lock:
+            if self.__lock_file is not None:
+                self.__reload(progress)
+                return
+            with self.__locked(fcntl.LOCK_SH) as lock:
+                self.__reload(progress)
+                FileStorage.__version = self.__read_version(lock)
+            self.__relayout_later()
+
+    def __reload(self, progress=None):
+        """Read the files as reload() does, without flushing first."""
+        with self.__batch():
+            shards = self.__shard_paths()
+            stale = bool(shards) and not self.__shards
+            if self.__lazy:
+                stale = self.__map(shards) or stale
+                shards = []
+            try:
+                if not self.__lazy:
+                    for key, obj_data in self.__snapshot(self.__file_path,
+                                                         progress):
+                        self.__load(obj_data)
+                    stale = stale or bool(self.__shards)
+            except FileNotFoundError:
+                pass
+            if shards:
+                total = sum(os.path.getsize(path) for path in shards)
+                done = 0
+                workers = min(len(shards), os.cpu_count() or 1)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = {executor.submit(self.__read, path): path
+                               for path in shards}
+                    for future in as_completed(futures):
+                        path = futures[future]
+                        for key, obj_data in future.result():
+                            self.__load(obj_data)
+                            if self.__shards and not stale:
+                                stale = path != self.__shard_path(
+                                    self.__shard(key))
+                        done += os.path.getsize(path)
+                        if progress is not None:
+                            progress(done, total)
+            self.__replay()
+            if stale or (self.__journal_records and not self.__journal):
+                if self.__lock_shared:
+                    # Upgrading the lock would let another process write
+                    # unseen in between
+                    FileStorage.__relayout_pending = True
+                else:
+                    self.__relayout()
+            FileStorage.__generation = self.__stat()
+
+    def __relayout(self):
+        """Rewrite the files in the current layout and drop the others."""
+        self.compact()
+        if not self.__shards:
+            self.__prune()
+
+    def __relayout_later(self):
+        """Run the __relayout() deferred while the shared lock was held."""
+        if self.__relayout_pending:
+            FileStorage.__relayout_pending = False
+            self.__relayout()
+
+    def __map(self, shards):
+        """Map the snapshot files and index their records as unloaded.
+
+        Objects already in memory are dropped in favour of their record,
+        as reload() would replace them, unless they have unsaved changes.
+
+        Returns:
+            bool: whether the files do not match the current shard layout.
+        """
+        old_maps = self.__maps[:]
+        del self.__maps[:]
+        self.__unloaded.clear()
+        self.__cached.clear()
+        stale = False
+        paths = [self.__file_path] + shards
+        for path in paths:
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                continue
+            with open(path, "rb") as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__maps.append(buffer)
+            table, records = binary_format.scan(buffer)
+            if not self.__names.names:
+                for name in table.names:
+                    self.__names.intern(name)
+            same_names = table.names == \
+                self.__names.names[:len(table.names)]
+            source = (buffer, table, same_names)
+            for key, start, end in records:
+                if key in self.__dirty:
+                    continue
+                if key in self.__objects:
+                    self.__remove(key)
+                    self.__dirty.pop(key, None)
+                self.__unloaded.setdefault(key.partition(".")[0], {})[key] = \
+                    (source, start, end)
+                if self.__shards and not stale:
+                    stale = path != self.__shard_path(self.__shard(key))
+        for buffer in old_maps:
+            buffer.close()
+        return stale
+
+    def __read(self, path):
+        """Return the (key, value) pairs of the snapshot file at path."""
+        return list(self.__snapshot(path))
+
+    def __members(self, file, progress=None):
+        """Yield the (key, value) pairs of the JSON object in file.
+
+        The file is read in chunks of __chunk_size characters and every
+        member is decoded on its own; save() writes ASCII only, so the
+        number of characters read is also the number of bytes.
+        """
+        decoder = json.JSONDecoder()
+        total = os.fstat(file.fileno()).st_size
+        done = 0
+        buffer, pos = "", 0
+        started = False
+        while True:
+            try:
+                while buffer[pos].isspace():
+                    pos += 1
+                if not started:
+                    if buffer[pos] != "{":
+                        raise json.JSONDecodeError(
+                            "Expecting '{'", buffer, pos)
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == "}":
+                    return
+                if buffer[pos] == ",":
+                    pos += 1
+                    continue
+                key, end = decoder.raw_decode(buffer, pos)
+                while buffer[end].isspace():
+                    end += 1
+                if buffer[end] != ":":
+                    raise json.JSONDecodeError("Expecting ':'", buffer, end)
+                end += 1
+                while buffer[end].isspace():
+                    end += 1
+                value, end = decoder.raw_decode(buffer, end)
+                if end == len(buffer):
+                    raise IndexError(end)
+            except (IndexError, json.JSONDecodeError):
+                chunk = file.read(self.__chunk_size)
+                if not chunk:
+                    raise json.JSONDecodeError(
+                        "Unexpected end of file", buffer, pos)
+                done += len(chunk)
+                buffer, pos = buffer[pos:] + chunk, 0
+                if progress is not None:
+                    progress(done, total)
+                continue
+            pos = end
+            yield key, value
+
+    def __replay(self, offset=0):
+        """Apply the journal records to __objects, in order.
+
+        A torn record left by an interrupted append is cut off so that
+        later appends start on a clean line. Objects with unsaved changes
+        are left as they are.
+
+        Args:
+            offset (int): position of the first record to apply.
+        """
+        if not offset:
+            FileStorage.__journal_records = 0
+        FileStorage.__journal_offset = 0
         try:
-            with open(self.__file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                for obj_data in data.values():
-                    class_name = obj_data["__class__"]
-                    del obj_data["__class__"]
-                    self.new(eval(class_name)(**obj_data))
+            with open(self.__journal_path, "r+b") as file:
+                file.seek(offset)
+                for line in file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("torn record")
+                        record = json.loads(line)
+                    except ValueError:
+                        file.truncate(offset)
+                        break
+                    offset += len(line)
+                    if record["key"] not in self.__dirty:
+                        if record["op"] == "upsert":
+                            self.__load(record["obj"])
+                        else:
+                            self.__remove(record["key"])
+                    FileStorage.__journal_records += 1
+                FileStorage.__journal_offset = offset
         except FileNotFoundError:
             pass
 
+    def __load(self, obj_data):
+        """Instantiate an object from its dictionary and store it clean."""
+        class_name = obj_data.pop("__class__")
+        obj = eval(class_name)(**obj_data)
+        self.new(obj)
+        self.__dirty.pop("{}.{}".format(class_name, obj.id), None)
+        return obj
+
+    def __remove(self, key):
+        """Drop key from __objects and every index."""
+        obj = self.__objects.pop(key, None)
+        if obj is not None:
+            self.__classes.get(type(obj), {}).pop(key, None)
+            self.__mutated()
+        self.__fragments.pop(key, None)
+        self.__unlink(key)
+        if self.__maps:
+            self.__forget(key)
+
     def delete(self, obj=None):
         """Deletes a given instance from __objects, if it exists."""
+        if obj is None:
+            return
         key = "{}.{}".format(type(obj).__name__, obj.id)
-        self.__objects.pop(key, None)
+        undo = getattr(self.__local, "undo", None)
+        if undo is not None and key not in undo:
+            undo[key] = self.__objects.get(key)
+        self.__remove(key)
+        self.__order(key, False)
+        self.__touch(key, None)
 
     def close(self):
-        """Call reload method for deserializing the JSON file to objects."""
-        self.reload()
+        """Apply the changes made to the files since they were last read.
+
+        Nothing is read when no file changed. Otherwise only the changed
+        snapshot files are parsed and only the new journal records are
+        replayed; the lazy mode maps the files again. In multi-process
+        mode the files are only looked at when the store version moved.
+        Changes waiting for the write-behind flusher are kept, and left
+        to it.
+        """
+        with self.__write_lock:
+            if not self.__multiprocess:
+                self.__catch_up()
+                return
+            with self.__locked(fcntl.LOCK_SH) as lock:
+                version = self.__read_version(lock)
+                if version != self.__version:
+                    self.__catch_up()
+                    FileStorage.__version = version
+            self.__relayout_later()
+
+    def __catch_up(self):
+        """Apply the files that changed since they were last read."""
+        generation = self.__stat()
+        if generation == self.__generation:
+            return
+        with self.__batch():
+            if self.__lazy:
+                self.__reload()
+                return
+            old = self.__generation
+            journal = self.__journal_path
+            changed = [path for path, marker in generation.items()
+                       if path != journal and old.get(path) != marker]
+            removed = [path for path in old
+                       if path != journal and path not in generation]
+            if changed or removed:
+                self.__refresh(changed, removed)
+            offset = self.__journal_offset
+            before, after = old.get(journal), generation.get(journal)
+            if changed or removed or before is None or after is None or \
+                    before[0] != after[0] or after[2] < offset:
+                offset = 0
+            self.__replay(offset)
+            FileStorage.__generation = self.__stat()
+
+    def __stat(self):
+        """Return the (inode, mtime, size) marker of each existing file."""
+        generation = {}
+        for path in [self.__file_path, self.__journal_path] + \
+                self.__shard_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            generation[path] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return generation
+
+    def __refresh(self, changed, removed):
+        """Apply the snapshot files that changed or were removed.
+
+        Objects whose updated_at did not change are kept as they are,
+        and objects with unsaved changes are never replaced. Clean objects
+        missing from the files they belong to are dropped.
+        """
+        seen = set()
+        for path in changed:
+            for key, obj_data in self.__snapshot(path):
+                seen.add(key)
+                if key in self.__dirty:
+                    continue
+                obj = self.__objects.get(key)
+                if obj is not None:
+                    updated_at = obj.updated_at
+                    if isinstance(obj_data.get("updated_at"), str):
+                        updated_at = updated_at.strftime(time_format)
+                    if updated_at == obj_data.get("updated_at"):
+                        continue
+                self.__load(obj_data)
+        paths = set(changed) | set(removed)
+        for key in list(self.__objects):
+            if key in seen or key in self.__dirty:
+                continue
+            path = self.__file_path
+            if self.__shards:
+                path = self.__shard_path(self.__shard(key))
+            if path in paths:
+                self.__remove(key)
 
     def get(self, cls, id):
         """Retrieve an object based on class and ID"""
+        if isinstance(cls, str):
+            cls = eval(cls)
         key = "{}.{}".format(cls.__name__, id)
-        return self.all(cls).get(key, None)
+        obj = self.__classes.get(cls, {}).get(key, None)
+        if obj is not None:
+            if key in self.__cached:
+                self.__cached.move_to_end(key)
+            return obj
+        record = self.__unloaded.get(cls.__name__, {}).get(key, None)
+        if record is not None:
+            return self.__hydrate(key, record)
+        return None
+
+    def iter(self, cls, batch_size=1000, after_id=None, **criteria):
+        """Yield the objects of cls in id order, batch_size at a time.
+
+        Each batch of ids is read from the sorted ids kept per class,
+        after the last id yielded, so objects added or deleted during
+        the iteration are seen as the DB engine would see them. Objects
+        left unloaded by the lazy mode are only loaded batch by batch.
 
-    def count(self, cls=None):
-        """Count the number of objects in storage"""
+        Args:
+            cls (str or class): the class of the objects.
+            batch_size (int): number of objects looked up at a time.
+            after_id (str, optional): only yield the objects whose id
+                sorts after it, as in keyset pagination.
+            **criteria: filters, see models.engine.criteria.
+        """
+        conditions = parse(criteria)
+        if isinstance(cls, str):
+            cls = eval(cls)
+        names = {klass.__name__ for klass in list(self.__classes)
+                 if issubclass(klass, cls)}
+        names.update(name for name in list(self.__unloaded)
+                     if issubclass(eval(name), cls))
+        for id, name in heapq.merge(*[
+                self.__keyset(name, after_id, batch_size)
+                for name in names]):
+            obj = self.get(name, id)
+            if obj is not None and matches(obj, conditions):
+                yield obj
+
+    def counts(self, *classes):
+        """Return the number of objects of each class.
+
+        The per-class buckets are kept up to date by every change, so
+        this only adds up their sizes.
+
+        Args:
+            *classes (str or class): the classes to count. Defaults to
+                every class holding objects.
+
+        Returns:
+            dict: the number of objects, keyed by class.
+        """
+        if not classes:
+            classes = set(self.__classes)
+            classes.update(eval(name) for name in self.__unloaded)
+        return {eval(cls) if isinstance(cls, str) else cls: self.count(cls)
+                for cls in classes}
+
+    def count(self, cls=None, **criteria):
+        """Count the number of objects in storage
+
+        With criteria, only the objects matching them are counted.
+        """
+        if criteria:
+            return len(self.all(cls, **criteria))
+        unloaded = self.__unloaded.values()
         if cls:
-            return len([obj for obj in self.all(
-                cls).values() if isinstance(obj, cls)])
-        return len(self.all())
+            unloaded = self.__buckets(cls, self.__unloaded)
+            return sum(len(bucket) for bucket in self.__buckets(cls)) + \
+                sum(len(bucket) for bucket in unloaded)
+        return len(self.__objects) + sum(len(bucket) for bucket in unloaded)
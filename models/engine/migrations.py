@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""Versioned schema migrations for the SQL storage engines.
+
+create_all() only creates the tables that are missing, so changes to
+existing tables are written as migrations: functions of a Connection,
+registered with increasing version numbers by @migration. The schema
+version of a database is kept in its schema_version table, one row per
+applied migration, and upgrade() applies the missing ones in order.
+
+Migrations check the schema before changing it, so they can also run
+on a database whose tables were created by create_all() after them.
+
+Usage: python3 -m models.engine.migrations [current | upgrade [VERSION]]
+(with HBNB_TYPE_STORAGE=db or sqlite)
+"""
+
+from datetime import datetime
+import sys
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, \
+    String, Table, inspect
+
+MIGRATIONS = []
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False))
+
+
+def migration(version):
+    """Register the decorated function as the migration to version."""
+    def register(function):
+        """Add function to MIGRATIONS, kept sorted by version."""
+        if any(number == version for number, _ in MIGRATIONS):
+            raise ValueError("Duplicate migration {}".format(version))
+        MIGRATIONS.append((version, function))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return function
+    return register
+
+
+def current(engine):
+    """Return the schema version of the database, or 0."""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table("schema_version"):
+            return 0
+        versions = [row[0] for row in connection.execute(
+            schema_version.select())]
+    return max(versions, default=0)
+
+
+def upgrade(engine, target=None):
+    """Apply the migrations after the current version, up to target.
+
+    Each migration runs in its own transaction, together with the row
+    recording it.
+
+    Returns:
+        list: the versions applied.
+    """
+    schema_version.create(engine, checkfirst=True)
+    version = current(engine)
+    applied = []
+    for number, function in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        with engine.begin() as connection:
+            function(connection)
+            connection.execute(schema_version.insert().values(
+                version=number, description=function.__doc__.strip(),
+                applied_at=datetime.utcnow()))
+        applied.append(number)
+    return applied
+
+
+def stamp(engine):
+    """Record every migration as applied, for a database created whole
+    by create_all()."""
+    schema_version.create(engine, checkfirst=True)
+    version = current(engine)
+    with engine.begin() as connection:
+        for number, function in MIGRATIONS:
+            if number > version:
+                connection.execute(schema_version.insert().values(
+                    version=number, description=function.__doc__.strip(),
+                    applied_at=datetime.utcnow()))
+
+
+def create_index(connection, table, name, *columns):
+    """Create the index name on columns of table, unless it exists."""
+    if any(index["name"] == name
+           for index in inspect(connection).get_indexes(table)):
+        return
+    table = Table(table, MetaData(), autoload_with=connection)
+    Index(name, *[table.c[column] for column in columns]).create(connection)
+
+
+def drop_index(connection, table, name):
+    """Drop the index name of table, if it exists."""
+    if not any(index["name"] == name
+               for index in inspect(connection).get_indexes(table)):
+        return
+    table = Table(table, MetaData(), autoload_with=connection)
+    Index(name, _table=table).drop(connection)
+
+
+@migration(1)
+def lookup_indexes(connection):
+    """Index the foreign key and name columns."""
+    for table, column in [("amenities", "name"), ("cities", "state_id"),
+                          ("cities", "name"), ("places", "city_id"),
+                          ("places", "user_id"), ("places", "name"),
+                          ("reviews", "place_id"), ("reviews", "user_id"),
+                          ("states", "name")]:
+        create_index(connection, table, "ix_{}_{}".format(table, column),
+                     column)
+
+
+@migration(2)
+def access_path_indexes(connection):
+    """Index places by city and price, reviews by place and date, and
+    users by email."""
+    create_index(connection, "places", "ix_places_city_id_price_by_night",
+                 "city_id", "price_by_night")
+    create_index(connection, "reviews", "ix_reviews_place_id_created_at",
+                 "place_id", "created_at")
+    create_index(connection, "users", "ix_users_email", "email")
+    # Both are prefixes of the indexes above
+    drop_index(connection, "places", "ix_places_city_id")
+    drop_index(connection, "reviews", "ix_reviews_place_id")
+
+
+if __name__ == "__main__":
+    from models import sql_storage, storage
+    if not sql_storage or len(sys.argv) < 2 or \
+            sys.argv[1] not in ("current", "upgrade"):
+        print("Usage: {} [current | upgrade [VERSION]] "
+              "(with a SQL storage)".format(sys.argv[0]))
+        sys.exit(1)
+    if sys.argv[1] == "upgrade":
+        target = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        print("Applied: {}".format(storage.migrate(target) or "none"))
+    print("Schema version: {}".format(storage.schema_version()))
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""Bounded LRU/TTL cache of objects, used by DBStorage.get().
+
+Classes:
+    ObjectCache: Maps (class, id) keys to objects.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class ObjectCache:
+    """
+    Thread-safe cache keeping at most size objects, each for ttl seconds.
+
+    Attributes:
+        size (int): maximum number of cached objects.
+        ttl (float): seconds an object stays valid, or 0 for no limit.
+        hits (int): lookups that found a valid object.
+        misses (int): lookups that did not.
+        evictions (int): objects dropped to stay within size.
+    """
+
+    def __init__(self, size, ttl=0):
+        """Create an empty cache of size objects kept for ttl seconds."""
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """Return the object cached under key, or None."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.ttl and \
+                    time.monotonic() - entry[1] > self.ttl:
+                del self.__entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, obj):
+        """Cache obj under key, evicting the least recently used object."""
+        with self.__lock:
+            self.__entries[key] = (obj, time.monotonic())
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.size:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop the object cached under key, if any."""
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        """Drop every cached object."""
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        """Return the hit/miss statistics of the cache.
+
+        Returns:
+            dict: hits, misses, hit_rate, evictions, size and capacity.
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions,
+                    "size": len(self.__entries), "capacity": self.size}
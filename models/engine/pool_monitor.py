@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+"""Connection pool telemetry, used by DBStorage.pool_stats().
+
+Classes:
+    PoolMonitor: Counts the checkouts of an engine's pool and times them.
+    MonitoredQueuePool: QueuePool reporting to a PoolMonitor.
+    MonitoredSingletonThreadPool: SingletonThreadPool reporting to a
+        PoolMonitor.
+"""
+
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, SingletonThreadPool
+
+
+class PoolMonitor:
+    """
+    Thread-safe counters describing the use of a connection pool.
+
+    Attributes:
+        checkouts (int): connections handed out by the pool.
+        checked_out (int): connections currently handed out.
+        timeouts (int): checkouts that gave up waiting for a connection.
+        checkout_time (float): seconds spent in checkouts, pre-ping
+            included.
+        checkout_max (float): longest checkout, in seconds.
+        wait_time (float): seconds spent waiting for a free connection
+            or opening a new one.
+        wait_max (float): longest wait, in seconds.
+    """
+
+    def __init__(self):
+        """Create a monitor with every counter at 0."""
+        self.checkouts = 0
+        self.checked_out = 0
+        self.timeouts = 0
+        self.checkout_time = 0.0
+        self.checkout_max = 0.0
+        self.wait_time = 0.0
+        self.wait_max = 0.0
+        self.__engine = None
+        self.__lock = threading.Lock()
+
+    def attach(self, engine):
+        """Record the checkouts of the pool of engine.
+
+        Checkouts are always counted; they are only timed when the
+        pool is one of the Monitored pools of this module.
+        """
+        self.__engine = engine
+        if isinstance(engine.pool, MonitoredPool):
+            engine.pool.monitor = self
+        event.listen(engine, "checkout", self.__checkout)
+        event.listen(engine, "checkin", self.__checkin)
+
+    def __checkout(self, dbapi_connection, record, proxy):
+        """Count a connection handed out by the pool."""
+        with self.__lock:
+            self.checkouts += 1
+            self.checked_out += 1
+
+    def __checkin(self, dbapi_connection, record):
+        """Count a connection returned to the pool."""
+        with self.__lock:
+            self.checked_out -= 1
+
+    def timed_checkout(self, seconds):
+        """Record a checkout that took seconds."""
+        with self.__lock:
+            self.checkout_time += seconds
+            self.checkout_max = max(self.checkout_max, seconds)
+
+    def timed_wait(self, seconds, timeout=False):
+        """Record a wait for a connection that took seconds."""
+        with self.__lock:
+            self.wait_time += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timeout:
+                self.timeouts += 1
+
+    def stats(self):
+        """Return the pool statistics.
+
+        Returns:
+            dict: the pool size, checked_out and overflow connections
+                (overflow is None for pools without one), checkouts,
+                timeouts, and the average and maximum checkout and
+                wait times in milliseconds.
+        """
+        pool = self.__engine.pool if self.__engine else None
+        size = getattr(pool, "size", 0)
+        if callable(size):
+            size = size()
+        with self.__lock:
+            count = self.checkouts or 1
+            return {
+                "size": size,
+                "checked_out": self.checked_out,
+                "overflow": max(pool.overflow(), 0)
+                if isinstance(pool, QueuePool) else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "checkout_avg_ms": self.checkout_time / count * 1000,
+                "checkout_max_ms": self.checkout_max * 1000,
+                "wait_avg_ms": self.wait_time / count * 1000,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+
+class MonitoredPool:
+    """Mixin timing the checkouts of a SQLAlchemy pool.
+
+    Attributes:
+        monitor (PoolMonitor): where the timings are recorded, or None.
+    """
+
+    monitor = None
+
+    def recreate(self):
+        """Return a new pool reporting to the same monitor."""
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+    def connect(self):
+        """Check out a connection, timing the whole checkout."""
+        start = time.perf_counter()
+        connection = super().connect()
+        if self.monitor is not None:
+            self.monitor.timed_checkout(time.perf_counter() - start)
+        return connection
+
+    def _do_get(self):
+        """Take a connection from the pool, timing the wait for it."""
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.monitor is not None:
+                self.monitor.timed_wait(time.perf_counter() - start, True)
+            raise
+        if self.monitor is not None:
+            self.monitor.timed_wait(time.perf_counter() - start)
+        return connection
+
+
+class MonitoredQueuePool(MonitoredPool, QueuePool):
+    """QueuePool whose checkouts are timed."""
+
+
+class MonitoredSingletonThreadPool(MonitoredPool, SingletonThreadPool):
+    """SingletonThreadPool whose checkouts are timed."""
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""SQLiteStorage Engine Module.
+
+This module defines the storage engine used when HBNB_TYPE_STORAGE is
+"sqlite". It stores the models in an embedded SQLite database, by
+default hbnb.db, or the file named by HBNB_SQLITE_PATH. The files named
+by HBNB_SQLITE_REPLICAS serve as read replicas.
+
+Classes:
+    SQLiteStorage: Represents the SQLite storage engine.
+"""
+
+from os import getenv
+from models.engine.db_storage import DBStorage
+from models.engine.pool_monitor import MonitoredQueuePool
+from sqlalchemy import create_engine, event
+
+
+class SQLiteStorage(DBStorage):
+    """
+    Represents the SQLite storage engine.
+
+    It has the interface of DBStorage and uses the same mapped models,
+    whose foreign key and name columns are indexed. The connections are
+    pooled as for MySQL, sized by the HBNB_DB_POOL_* variables, and the
+    session of each thread holds its own until it is closed. The database
+    runs in WAL mode so that readers do not block the writer.
+    """
+
+    def __init__(self, path=None, replicas=None):
+        """Initialize a new SQLiteStorage instance.
+
+        Args:
+            path (str, optional): The database file. Defaults to
+                HBNB_SQLITE_PATH, or hbnb.db.
+            replicas (list, optional): Database files serving the reads,
+                see DBStorage. Defaults to the files listed, separated
+                by commas, by HBNB_SQLITE_REPLICAS.
+        """
+        if path is None:
+            path = getenv("HBNB_SQLITE_PATH", "hbnb.db")
+        if replicas is None:
+            replicas = [replica for replica in getenv(
+                "HBNB_SQLITE_REPLICAS", "").split(",") if replica]
+        super().__init__(self._engine(path),
+                         [self._engine(replica) for replica in replicas])
+
+    @classmethod
+    def _engine(cls, path):
+        """Return an engine on the database file path."""
+        engine = create_engine("sqlite:///{}".format(path),
+                               poolclass=MonitoredQueuePool,
+                               **cls.pool_options())
+        event.listen(engine, "connect", cls._configure)
+        return engine
+
+    @staticmethod
+    def _configure(connection, record):
+        """Set the pragmas of each new connection."""
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
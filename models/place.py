@@ -3,24 +3,30 @@
 This module defines the Place class, representing a place entity in the database.
 """
 
-from os import getenv
-from sqlalchemy import Column, Float, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import relationship
+import models
+from models.amenity import Amenity
 from models.base_model import Base, BaseModel
+from models.review import Review
+from models.user import User
 
-association_table = Table(
-    "place_amenity",
-    Base.metadata,
-    Column(
-        "place_id", String(60), ForeignKey("places.id"),
-        primary_key=True, nullable=False
-    ),
-    Column(
-        "amenity_id", String(60), ForeignKey("amenities.id"),
-        primary_key=True, nullable=False
-    ),
-    mysql_charset="latin1"
-)
+if models.sql_storage:
+    from sqlalchemy import Column, Float, ForeignKey, Index, Integer, \
+        String, Table
+    from sqlalchemy.orm import relationship
+
+    association_table = Table(
+        "place_amenity",
+        Base.metadata,
+        Column(
+            "place_id", String(60), ForeignKey("places.id"),
+            primary_key=True, nullable=False
+        ),
+        Column(
+            "amenity_id", String(60), ForeignKey("amenities.id"),
+            primary_key=True, nullable=False
+        ),
+        mysql_charset="latin1"
+    )
 
 
 class Place(BaseModel, Base):
@@ -45,26 +51,45 @@ class Place(BaseModel, Base):
     """
 
     __tablename__ = "places"
-    id = Column(String(60), primary_key=True, nullable=False)
-    city_id = Column(String(60), ForeignKey("cities.id"), nullable=False)
-    user_id = Column(String(60), ForeignKey("users.id"), nullable=False)
-    name = Column(String(128), nullable=False)
-    description = Column(String(1024))
-    number_rooms = Column(Integer, default=0)
-    number_bathrooms = Column(Integer, default=0)
-    max_guest = Column(Integer, default=0)
-    price_by_night = Column(Integer, default=0)
-    latitude = Column(Float)
-    longitude = Column(Float)
-    reviews = relationship("Review", backref="place", cascade="delete")
-    amenities = relationship(
-        "Amenity",
-        secondary="place_amenity",
-        backref="place_amenities",
-        viewonly=False
-    )
 
-    __table_args__ = {'mysql_charset': 'latin1'}
+    if models.sql_storage:
+        id = Column(String(60), primary_key=True, nullable=False)
+        city_id = Column(String(60), ForeignKey("cities.id"),
+                         nullable=False)
+        user_id = Column(String(60), ForeignKey("users.id"),
+                         nullable=False, index=True)
+        name = Column(String(128), nullable=False, index=True)
+        description = Column(String(1024))
+        number_rooms = Column(Integer, default=0)
+        number_bathrooms = Column(Integer, default=0)
+        max_guest = Column(Integer, default=0)
+        price_by_night = Column(Integer, default=0)
+        latitude = Column(Float)
+        longitude = Column(Float)
+        reviews = relationship("Review", backref="place", cascade="delete")
+        amenities = relationship(
+            "Amenity",
+            secondary="place_amenity",
+            backref="place_amenities",
+            viewonly=False
+        )
+        # The places of a city, by price
+        __table_args__ = (
+            Index("ix_places_city_id_price_by_night",
+                  "city_id", "price_by_night"),
+            {'mysql_charset': 'latin1'})
+    else:
+        city_id = ""
+        user_id = ""
+        name = ""
+        description = ""
+        number_rooms = 0
+        number_bathrooms = 0
+        max_guest = 0
+        price_by_night = 0
+        latitude = 0.0
+        longitude = 0.0
+        __table_args__ = {'mysql_charset': 'latin1'}
 
     def __init__(self, *args, **kwargs):
         """
@@ -75,42 +100,57 @@ class Place(BaseModel, Base):
             **kwargs: Keyword arguments for setting attributes.
         """
         super().__init__(*args, **kwargs)
+        if not models.sql_storage:
+            if "amenity_ids" not in self.__dict__:
+                self.amenity_ids = []
 
-    @property
-    def reviews(self):
-        """
-        Get a list of all linked Review instances.
+    if not models.sql_storage:
+        @property
+        def reviews(self):
+            """
+            Get a list of all linked Review instances.
 
-        Returns:
-            list: List of linked Review objects.
-        """
-        review_list = [
-            review for review in list(storage.all(Review).values())
-            if review.place_id == self.id
-        ]
-        return review_list
-
-    @property
-    def amenities(self):
-        """
-        Get/set linked Amenities.
+            Returns:
+                list: List of linked Review objects.
+            """
+            from models import storage
+            return list(storage.related(Review, "place_id", self.id).values())
 
-        Returns:
-            list: List of linked Amenity objects.
-        """
-        amenity_list = [
-            amenity for amenity in list(storage.all(Amenity).values())
-            if amenity.id in self.amenity_ids
-        ]
-        return amenity_list
-
-    @amenities.setter
-    def amenities(self, value):
-        """
-        Set linked Amenities.
+        @property
+        def amenities(self):
+            """
+            Get/set linked Amenities.
 
-        Args:
-            value (Amenity): Amenity object to be linked.
-        """
-        if isinstance(value, Amenity):
-            self.amenity_ids.append(value.id)
+            Returns:
+                list: List of linked Amenity objects.
+            """
+            from models import storage
+            amenity_list = []
+            for amenity_id in self.amenity_ids:
+                amenity = storage.get(Amenity, amenity_id)
+                if amenity is not None:
+                    amenity_list.append(amenity)
+            return amenity_list
+
+        @amenities.setter
+        def amenities(self, value):
+            """
+            Set linked Amenities.
+
+            Args:
+                value (Amenity): Amenity object to be linked.
+            """
+            if isinstance(value, Amenity) and \
+                    value.id not in self.amenity_ids:
+                self.amenity_ids = self.amenity_ids + [value.id]
+
+        @property
+        def user(self):
+            """
+            Get the User owning the place.
+
+            Returns:
+                User: The owner, or None if it does not exist.
+            """
+            from models import storage
+            return storage.get(User, self.user_id)
@@ -3,11 +3,13 @@
 This module defines the Review class, representing a review entity in the database.
 """
 
+import models
 from models.base_model import BaseModel, Base
-from sqlalchemy import Column, ForeignKey, String, Integer, DateTime
-from sqlalchemy.orm import relationship
 from datetime import datetime
 
+if models.sql_storage:
+    from sqlalchemy import Column, ForeignKey, String, DateTime, Index
+
 
 class Review(BaseModel, Base):
     """
@@ -26,14 +28,25 @@ class Review(BaseModel, Base):
     """
 
     __tablename__ = "reviews"
-    id = Column(String(60), primary_key=True, nullable=False)
-    text = Column(String(1024), nullable=False)
-    place_id = Column(String(60), ForeignKey("places.id"), nullable=False)
-    user_id = Column(String(60), ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime, nullable=True)
-
-    __table_args__ = {'mysql_charset': 'latin1'}
+    if models.sql_storage:
+        id = Column(String(60), primary_key=True, nullable=False)
+        text = Column(String(1024), nullable=False)
+        place_id = Column(String(60), ForeignKey("places.id"),
+                          nullable=False)
+        user_id = Column(String(60), ForeignKey("users.id"), nullable=False,
+                         index=True)
+        created_at = Column(DateTime, nullable=False,
+                            default=datetime.utcnow)
+        updated_at = Column(DateTime, nullable=True)
+        # The reviews of a place, in creation order
+        __table_args__ = (
+            Index("ix_reviews_place_id_created_at", "place_id", "created_at"),
+            {'mysql_charset': 'latin1'})
+    else:
+        text = ""
+        place_id = ""
+        user_id = ""
+        __table_args__ = {'mysql_charset': 'latin1'}
 
     def save(self):
         """
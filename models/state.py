@@ -4,11 +4,13 @@ This module defines the State class, representing a state entity in the database
 """
 
 from models.base_model import BaseModel, Base
-from sqlalchemy import Column, String, ForeignKey
-from sqlalchemy.orm import relationship
-from os import getenv
+import models
 from models.city import City
 
+if models.sql_storage:
+    from sqlalchemy import Column, String
+    from sqlalchemy.orm import relationship
+
 
 class State(BaseModel, Base):
     """
@@ -23,11 +25,14 @@ class State(BaseModel, Base):
     """
 
     __tablename__ = "states"
-    name = Column(String(128), nullable=False)
+    if models.sql_storage:
+        name = Column(String(128), nullable=False, index=True)
+    else:
+        name = ""
 
     __table_args__ = {'mysql_charset': 'latin1'}
 
-    if getenv("HBNB_TYPE_STORAGE", None) != "db":
+    if not models.sql_storage:
         @property
         def cities(self):
             """
@@ -37,11 +42,7 @@ class State(BaseModel, Base):
                 list: List of City objects related to the state.
             """
             from models import storage
-            city_list = [
-                city for city in list(storage.all(City).values())
-                if city.state_id == self.id
-            ]
-            return city_list
+            return list(storage.related(City, "state_id", self.id).values())
 
     else:
         cities = relationship("City", backref="state",
@@ -3,12 +3,15 @@
 This module defines the User class, representing a user entity in the database.
 """
 
+import models
 from models.base_model import BaseModel, Base
-from sqlalchemy import Column, String, DateTime
-from sqlalchemy.orm import relationship
 from datetime import datetime
 from hashlib import md5
 
+if models.sql_storage:
+    from sqlalchemy import Column, String, DateTime
+    from sqlalchemy.orm import relationship
+
 
 class User(BaseModel, Base):
     """
@@ -30,17 +33,25 @@ class User(BaseModel, Base):
     """
 
     __tablename__ = "users"
-    id = Column(String(60), primary_key=True, nullable=False)
-    email = Column(String(128), nullable=False)
-    password = Column(String(128), nullable=False)
-    first_name = Column(String(128))
-    last_name = Column(String(128))
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime, nullable=False,
-                        default=datetime.utcnow, onupdate=datetime.utcnow)
+    if models.sql_storage:
+        id = Column(String(60), primary_key=True, nullable=False)
+        email = Column(String(128), nullable=False, index=True)
+        password = Column(String(128), nullable=False)
+        first_name = Column(String(128))
+        last_name = Column(String(128))
+        created_at = Column(DateTime, nullable=False,
+                            default=datetime.utcnow)
+        updated_at = Column(DateTime, nullable=False,
+                            default=datetime.utcnow,
+                            onupdate=datetime.utcnow)
 
-    places = relationship("Place", backref="user", cascade="delete")
-    reviews = relationship("Review", backref="user", cascade="delete")
+        places = relationship("Place", backref="user", cascade="delete")
+        reviews = relationship("Review", backref="user", cascade="delete")
+    else:
+        email = ""
+        password = ""
+        first_name = ""
+        last_name = ""
 
     __table_args__ = {'mysql_charset': 'latin1'}
 
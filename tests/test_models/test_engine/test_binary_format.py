@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""
+Contains test cases for the binary snapshot format of FileStorage.
+"""
+
+from datetime import datetime
+import inspect
+import io
+import json
+from models.engine import binary_format
+import os
+import pep8
+import shutil
+import tempfile
+import unittest
+
+
+class TestBinaryFormatDocs(unittest.TestCase):
+    """
+    Tests to check the documentation and style of binary_format.
+    """
+    def test_pep8_conformance_binary_format(self):
+        """
+        Ensure models/engine/binary_format.py conforms to PEP8 code style.
+        """
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/binary_format.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_binary_format_docstrings(self):
+        """
+        Ensure the module and its functions have docstrings.
+        """
+        self.assertTrue(len(binary_format.__doc__) >= 1)
+        for name, func in inspect.getmembers(binary_format,
+                                             inspect.isfunction):
+            self.assertTrue(func.__doc__,
+                            "{:s} needs a docstring".format(name))
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """
+    Test cases for encoding and decoding binary snapshots.
+    """
+    def setUp(self):
+        """
+        Create a temp dir for the snapshots.
+        """
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temp dir.
+        """
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        """
+        Test that every supported value survives a dump and a load.
+        """
+        obj_dict = {"__class__": "Place", "id": "1", "name": "Loft",
+                    "max_guest": 4, "latitude": 37.77, "description": None,
+                    "amenity_ids": ["a", "b"], "extra": {"k": [1, True]},
+                    "created_at": datetime(2023, 7, 26, 15, 34, 41, 123456)}
+        table = binary_format.NameTable()
+        path = os.path.join(self.tmp, "file.hbnb")
+        with open(path, "wb") as f:
+            binary_format.dump([binary_format.encode("Place.1", obj_dict,
+                                                     table)], table, f)
+        with open(path, "rb") as f:
+            self.assertEqual(list(binary_format.load(f)),
+                             [("Place.1", obj_dict)])
+
+    def test_bad_header(self):
+        """
+        Test that a file without the magic bytes is rejected.
+        """
+        with self.assertRaises(ValueError):
+            binary_format.read_header(io.BytesIO(b"{}"))
+
+    def test_converters(self):
+        """
+        Test the conversions between file.json and a binary snapshot.
+        """
+        data = {"State.1": {"__class__": "State", "id": "1", "name": "Utah",
+                            "created_at": "2023-07-26T15:34:41.123456"}}
+        src = os.path.join(self.tmp, "file.json")
+        binary = os.path.join(self.tmp, "file.hbnb")
+        dst = os.path.join(self.tmp, "copy.json")
+        with open(src, "w") as f:
+            json.dump(data, f)
+        binary_format.json_to_binary(src, binary)
+        with open(binary, "rb") as f:
+            _, obj_dict = next(binary_format.load(f))
+        self.assertEqual(obj_dict["created_at"],
+                         datetime(2023, 7, 26, 15, 34, 41, 123456))
+        binary_format.binary_to_json(binary, dst)
+        with open(dst) as f:
+            self.assertEqual(json.load(f), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
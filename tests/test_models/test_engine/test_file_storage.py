@@ -17,7 +17,14 @@ from models.user import User
 import json
 import os
 import pep8
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -86,7 +93,7 @@ class TestFileStorage(unittest.TestCase):
     """
     Test cases for the FileStorage class.
     """
-    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    @unittest.skipIf(models.sql_storage, "not testing file storage")
     def test_all_returns_dict(self):
         """
         Test that the 'all' method returns the FileStorage.__objects attribute.
@@ -95,33 +102,33 @@ class TestFileStorage(unittest.TestCase):
         obj = storage.all()
         self.assertIsNotNone(obj)
         self.assertEqual(type(obj), dict)
-        self.assertIs(obj, storage._FileStorage__objects)
+        self.assertEqual(obj, storage._FileStorage__objects)
 
-    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    @unittest.skipIf(models.sql_storage, "not testing file storage")
     def test_new(self):
         """
         Test that the 'new' method adds an object to the FileStorage.__objects attribute.
         """
         storage = FileStorage()
-        obj = storage.all()
         user = User()
         user.id = 123455
         user.name = "Kevin"
         storage.new(user)
+        obj = storage.all()
         key = user.__class__.__name__ + "." + str(user.id)
         self.assertIsNotNone(obj[key])
 
-    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    @unittest.skipIf(models.sql_storage, "not testing file storage")
     def test_save(self):
         """
         Test that the 'save' method properly saves objects to file.json.
         """
         storage = FileStorage()
-        obj = storage.all()
         user = User()
         user.id = 123455
         user.name = "Kevin"
         storage.new(user)
+        obj = storage.all()
         key = user.__class__.__name__ + "." + str(user.id)
         self.assertIsNotNone(obj[key])
         storage.save()
@@ -129,7 +136,7 @@ class TestFileStorage(unittest.TestCase):
             data = json.load(f)
         self.assertIn(key, data)
 
-    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    @unittest.skipIf(models.sql_storage, "not testing file storage")
     def test_get(self):
         """
         Test that the 'get' method returns an object with a given id.
@@ -145,7 +152,7 @@ class TestFileStorage(unittest.TestCase):
                 self.assertEqual(instance, obj)
                 self.assertEqual(not_exists, None)
 
-    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    @unittest.skipIf(models.sql_storage, "not testing file storage")
     def test_count(self):
         """
         Test that the 'count' method returns the number of objects in storage.
@@ -160,3 +167,1209 @@ class TestFileStorage(unittest.TestCase):
                 self.assertGreaterEqual(count, 1)
         total = storage.count()
         self.assertGreaterEqual(total, 1)
+
+
+class FileStorageTestCase(unittest.TestCase):
+    """
+    Base class running each test against an empty store in a temp dir.
+    """
+    indexes = ["_FileStorage__objects", "_FileStorage__classes",
+               "_FileStorage__relations", "_FileStorage__links",
+               "_FileStorage__dirty", "_FileStorage__fragments",
+               "_FileStorage__unloaded", "_FileStorage__cached",
+               "_FileStorage__views", "_FileStorage__sorted",
+               "_FileStorage__edits"]
+    settings = {"_FileStorage__file_path": "file.json",
+                "_FileStorage__journal_path": "file.json.journal",
+                "_FileStorage__journal": False,
+                "_FileStorage__journal_records": 0,
+                "_FileStorage__shards": 0,
+                "_FileStorage__format": "json",
+                "_FileStorage__lazy": False,
+                "_FileStorage__maps": [],
+                "_FileStorage__multiprocess": False,
+                "_FileStorage__version": 0}
+
+    def setUp(self):
+        """
+        Start every test from an empty store.
+        """
+        self.storage = models.storage
+        self.tmp = tempfile.mkdtemp()
+        self.saved = {}
+        for name in self.indexes:
+            self.saved[name] = getattr(FileStorage, name).copy()
+            getattr(FileStorage, name).clear()
+        for name, value in self.settings.items():
+            self.saved[name] = getattr(FileStorage, name)
+            if isinstance(value, str):
+                value = os.path.join(self.tmp, value)
+            elif isinstance(value, list):
+                value = []
+            setattr(FileStorage, name, value)
+
+    def tearDown(self):
+        """
+        Restore the objects that were stored before the test.
+        """
+        for name in self.indexes:
+            getattr(FileStorage, name).clear()
+            getattr(FileStorage, name).update(self.saved[name])
+        for name in self.settings:
+            setattr(FileStorage, name, self.saved[name])
+        shutil.rmtree(self.tmp)
+
+    def path(self, name):
+        """
+        Return the path of name inside the temp dir.
+        """
+        return os.path.join(self.tmp, name)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageIndexes(FileStorageTestCase):
+    """
+    Test cases for the per-class buckets and reverse indexes of FileStorage.
+    """
+    def test_all_cls_only_returns_bucket(self):
+        """
+        Test that 'all' with a class only returns instances of that class.
+        """
+        state = State()
+        user = User()
+        self.storage.new(state)
+        self.storage.new(user)
+        self.assertEqual(self.storage.all(State),
+                         {"State." + state.id: state})
+        self.assertEqual(self.storage.all("User"),
+                         {"User." + user.id: user})
+        self.assertEqual(len(self.storage.all(BaseModel)), 2)
+
+    def test_get_other_class(self):
+        """
+        Test that 'get' does not return an object of another class.
+        """
+        state = State()
+        self.storage.new(state)
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertIsNone(self.storage.get(City, state.id))
+
+    def test_delete_updates_counts(self):
+        """
+        Test that 'delete' removes the object from its class bucket.
+        """
+        first = State()
+        second = State()
+        self.storage.new(first)
+        self.storage.new(second)
+        self.assertEqual(self.storage.count(State), 2)
+        self.storage.delete(first)
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(self.storage.count(), 1)
+        self.assertIsNone(self.storage.get(State, first.id))
+        self.storage.delete(None)
+        self.assertEqual(self.storage.count(), 1)
+
+    def test_state_cities(self):
+        """
+        Test that State.cities follows new, delete and state_id changes.
+        """
+        california = State()
+        arizona = State()
+        napa = City(state_id=california.id)
+        page = City(state_id=arizona.id)
+        for obj in [california, arizona, napa, page]:
+            self.storage.new(obj)
+        self.assertEqual(california.cities, [napa])
+        napa.state_id = arizona.id
+        self.assertEqual(california.cities, [])
+        self.assertCountEqual(arizona.cities, [napa, page])
+        self.storage.delete(page)
+        self.assertEqual(arizona.cities, [napa])
+
+    def test_place_reviews_and_amenities(self):
+        """
+        Test that Place.reviews and Place.amenities use the indexes.
+        """
+        place = Place()
+        wifi = Amenity()
+        review = Review(place_id=place.id)
+        for obj in [place, wifi, review]:
+            self.storage.new(obj)
+        self.assertEqual(place.reviews, [review])
+        self.assertEqual(place.amenities, [])
+        place.amenities = wifi
+        self.assertEqual(place.amenities, [wifi])
+        self.assertEqual(self.storage.related(Place, "amenity_ids", wifi.id),
+                         {"Place." + place.id: place})
+
+    def test_all_criteria(self):
+        """
+        Test that 'all' and 'count' filter by equality, __in and ranges.
+        """
+        cheap = Place(name="Hut", price_by_night=40, amenity_ids=["wifi"])
+        fair = Place(name="Flat", price_by_night=90)
+        dear = Place(name="Loft", price_by_night=300)
+        for obj in [cheap, fair, dear, State(name="Hut")]:
+            self.storage.new(obj)
+        self.assertEqual(self.storage.all(Place, name="Hut"),
+                         {"Place." + cheap.id: cheap})
+        self.assertEqual(set(self.storage.all(Place, name__in=["Hut",
+                                                               "Loft"])),
+                         {"Place." + cheap.id, "Place." + dear.id})
+        self.assertEqual(set(self.storage.all(Place, price_by_night__gte=90,
+                                              price_by_night__lt=300)),
+                         {"Place." + fair.id})
+        self.assertEqual(list(self.storage.all(amenity_ids="wifi")),
+                         ["Place." + cheap.id])
+        self.assertEqual(self.storage.count(name="Hut"), 2)
+        self.assertEqual(self.storage.count(Place, price_by_night__gt=40), 2)
+        self.assertEqual(self.storage.count(Place, name="Villa"), 0)
+        with self.assertRaises(TypeError):
+            self.storage.all(Place, name__in="Hut")
+
+    def test_all_criteria_uses_index(self):
+        """
+        Test that foreign key criteria only look at the indexed objects.
+        """
+        california = State()
+        arizona = State()
+        napa = City(state_id=california.id, name="Napa")
+        page = City(state_id=arizona.id, name="Page")
+        for obj in [california, arizona, napa, page]:
+            self.storage.new(obj)
+        with mock.patch.dict(FileStorage._FileStorage__classes,
+                             {City: {}}):
+            self.assertEqual(self.storage.all(City, state_id=arizona.id),
+                             {"City." + page.id: page})
+            self.assertEqual(
+                self.storage.count(City, state_id__in=[california.id,
+                                                       arizona.id],
+                                   name="Napa"), 1)
+        page.state_id = california.id
+        self.assertEqual(self.storage.count(City, state_id=arizona.id), 0)
+
+    def test_prefetch(self):
+        """
+        Test that 'prefetch' walks the paths and returns the objects.
+        """
+        state = State()
+        user = User()
+        city = City(state_id=state.id)
+        place = Place(city_id=city.id, user_id=user.id)
+        for obj in [state, user, city, place]:
+            self.storage.new(obj)
+        self.assertEqual(self.storage.prefetch(
+            iter([state]), "cities.places.user", "name.missing"), [state])
+        self.assertEqual(city.places, [place])
+        self.assertIs(place.user, user)
+
+    def test_bulk(self):
+        """
+        Test that the bulk methods write their objects with one save.
+        """
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        with mock.patch.object(FileStorage, "save", autospec=True,
+                               side_effect=FileStorage.save) as save:
+            self.storage.bulk_new(iter(states))
+            self.assertEqual(save.call_count, 1)
+            self.storage.bulk_update(states[:2], name="Renamed")
+            self.assertEqual(save.call_count, 2)
+            self.storage.bulk_delete(states[3:])
+            self.assertEqual(save.call_count, 3)
+        with open(self.path("file.json")) as f:
+            data = json.load(f)
+        self.assertEqual(sorted(obj["name"] for obj in data.values()),
+                         ["Renamed", "Renamed", "State 2"])
+        self.assertEqual(self.storage.count(State), 3)
+        self.assertGreater(states[0].updated_at, states[2].updated_at)
+
+    def test_iter(self):
+        """
+        Test that 'iter' yields the objects in id order, after an id.
+        """
+        states = sorted([State(name=str(i % 2)) for i in range(7)],
+                        key=lambda state: state.id)
+        for state in states:
+            self.storage.new(state)
+        self.storage.new(City())
+        with mock.patch.object(FileStorage, "get", autospec=True,
+                               side_effect=FileStorage.get) as get:
+            objs = self.storage.iter(State, 3)
+            self.assertIs(next(objs), states[0])
+            self.assertEqual(get.call_count, 1)
+            self.assertEqual([states[0]] + list(objs), states)
+        self.assertEqual(list(self.storage.iter("State", 2, states[3].id)),
+                         states[4:])
+        self.assertEqual(list(self.storage.iter(State, after_id=states[1].id,
+                                                name="0")),
+                         [s for s in states[2:] if s.name == "0"])
+        self.storage.delete(states[5])
+        self.assertEqual(list(self.storage.iter(State, 2, states[3].id)),
+                         [states[4], states[6]])
+
+    def test_iter_keeps_ids_sorted(self):
+        """
+        Test that 'iter' sorts the ids of a class once, and that they are
+        kept sorted as objects are added and deleted.
+        """
+        states = [State(id="s{}".format(i)) for i in range(6)]
+        for state in states[:5]:
+            self.storage.new(state)
+        with mock.patch.object(file_storage, "sorted", create=True,
+                               side_effect=sorted) as sort:
+            objs = self.storage.iter(State, 2)
+            self.assertIs(next(objs), states[0])
+            self.storage.new(states[5])
+            self.storage.delete(states[3])
+            self.assertEqual(list(objs), [states[1], states[2], states[4],
+                                          states[5]])
+            self.assertEqual(list(self.storage.iter(State, 2, "s2")),
+                             [states[4], states[5]])
+        self.assertEqual(sort.call_count, 1)
+        self.assertEqual(FileStorage._FileStorage__sorted["State"],
+                         ["s0", "s1", "s2", "s4", "s5"])
+
+    def test_counts(self):
+        """
+        Test that 'counts' reads the sizes of the class buckets.
+        """
+        for obj in [State(), State(), City(), Amenity()]:
+            self.storage.new(obj)
+        self.assertEqual(self.storage.counts(),
+                         {State: 2, City: 1, Amenity: 1})
+        self.assertEqual(self.storage.counts(State, "User"),
+                         {State: 2, User: 0})
+
+    def test_save_reuses_clean_fragments(self):
+        """
+        Test that 'save' only encodes the objects that changed.
+        """
+        clean = State(name="Ohio")
+        dirty = Amenity(name="Wifi")
+        self.storage.new(clean)
+        self.storage.new(dirty)
+        self.storage.save()
+        dirty.name = "Pool"
+        with mock.patch.object(State, "to_dict", side_effect=AssertionError):
+            self.storage.save()
+        with open(self.path("file.json")) as f:
+            data = json.load(f)
+        self.assertEqual(data["State." + clean.id]["name"], "Ohio")
+        self.assertEqual(data["Amenity." + dirty.id]["name"], "Pool")
+        self.storage.delete(dirty)
+        self.storage.save()
+        with open(self.path("file.json")) as f:
+            self.assertEqual(list(json.load(f)), ["State." + clean.id])
+
+    def test_save_drops_fragment_of_changed_object(self):
+        """
+        Test that a fragment encoded while its object changed is not
+        reused by the next 'save'.
+        """
+        state = State(name="Old")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Mid"
+        to_dict = State.to_dict
+
+        def changing_to_dict(obj):
+            """Encode obj, then change it as another thread would."""
+            obj_dict = to_dict(obj)
+            if obj.name == "Mid":
+                obj.name = "New"
+            return obj_dict
+
+        with mock.patch.object(State, "to_dict", changing_to_dict):
+            self.storage.save()
+        self.storage.save()
+        with open(self.path("file.json")) as f:
+            self.assertEqual(json.load(f)["State." + state.id]["name"],
+                             "New")
+
+    def test_reload_streams_members(self):
+        """
+        Test that 'reload' reads the snapshot in chunks and reports progress.
+        """
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        data = {"State." + s.id: s.to_dict() for s in states}
+        with open(self.path("file.json"), "w") as f:
+            json.dump(data, f, indent=4)
+        calls = []
+        with mock.patch.object(FileStorage, "_FileStorage__chunk_size", 5):
+            self.storage.reload(lambda done, total: calls.append(
+                (done, total)))
+        self.assertEqual(set(self.storage.all()), set(data))
+        self.assertEqual(self.storage.get(State, states[3].id).name,
+                         "State 3")
+        size = os.path.getsize(self.path("file.json"))
+        self.assertEqual(calls[-1], (size, size))
+
+    def test_reload_truncated_snapshot(self):
+        """
+        Test that 'reload' rejects a snapshot that ends too early.
+        """
+        with open(self.path("file.json"), "w") as f:
+            f.write('{"State.1": {"__class__": "State", "id": "1"}')
+        with self.assertRaises(ValueError):
+            self.storage.reload()
+
+    def test_binary_format(self):
+        """
+        Test that objects survive a save and reload in the binary format.
+        """
+        FileStorage._FileStorage__format = "binary"
+        FileStorage._FileStorage__file_path = self.path("file.hbnb")
+        place = Place(name="Loft", amenity_ids=["a"], max_guest=3)
+        self.storage.new(place)
+        self.storage.save()
+        self.assertEqual(os.listdir(self.tmp), ["file.hbnb"])
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        self.storage.reload()
+        loaded = self.storage.get(Place, place.id)
+        self.assertIsNot(loaded, place)
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+        self.assertEqual(loaded.created_at, place.created_at)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageJournal(FileStorageTestCase):
+    """
+    Test cases for the journal mode of FileStorage.
+    """
+    def setUp(self):
+        """
+        Enable journal mode on top of the empty store.
+        """
+        super().setUp()
+        FileStorage._FileStorage__journal = True
+
+    def records(self):
+        """
+        Return the records currently in the journal.
+        """
+        with open(self.path("file.json.journal")) as f:
+            return [json.loads(line) for line in f]
+
+    def test_save_appends_changes(self):
+        """
+        Test that 'save' only appends the changed objects.
+        """
+        first = State(name="Ohio")
+        second = State(name="Iowa")
+        self.storage.new(first)
+        self.storage.new(second)
+        self.storage.save()
+        self.assertEqual(len(self.records()), 2)
+        first.name = "Nevada"
+        self.storage.save()
+        self.storage.delete(second)
+        self.storage.save()
+        records = self.records()
+        self.assertEqual([r["op"] for r in records],
+                         ["upsert", "upsert", "upsert", "delete"])
+        self.assertEqual(records[2]["obj"]["name"], "Nevada")
+        self.assertFalse(os.path.exists(self.path("file.json")))
+
+    def test_reload_replays_journal(self):
+        """
+        Test that 'reload' applies the journal on top of the snapshot.
+        """
+        kept = State(name="Idaho")
+        gone = State(name="Maine")
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.compact()
+        kept.name = "Utah"
+        self.storage.delete(gone)
+        self.storage.save()
+        with open(self.path("file.json.journal"), "a") as f:
+            f.write('{"op": "upsert", "key": "State.')
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["State." + kept.id])
+        self.assertEqual(self.storage.get(State, kept.id).name, "Utah")
+        self.assertEqual(len(self.records()), 2)
+
+    def test_compaction_threshold(self):
+        """
+        Test that a full journal is folded into a new snapshot.
+        """
+        FileStorage._FileStorage__journal_max = 3
+        try:
+            for _ in range(3):
+                self.storage.new(State(name="Texas"))
+                self.storage.save()
+        finally:
+            FileStorage._FileStorage__journal_max = 1000
+        self.assertFalse(os.path.exists(self.path("file.json.journal")))
+        with open(self.path("file.json")) as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageShards(FileStorageTestCase):
+    """
+    Test cases for the sharded snapshot layout of FileStorage.
+    """
+    def setUp(self):
+        """
+        Enable two id buckets per class on top of the empty store.
+        """
+        super().setUp()
+        FileStorage._FileStorage__shards = 2
+
+    def shards(self):
+        """
+        Return the names of the files in the temp dir.
+        """
+        return sorted(os.listdir(self.tmp))
+
+    def test_save_only_writes_dirty_shards(self):
+        """
+        Test that 'save' leaves the shards without changes untouched.
+        """
+        state = State(name="Ohio")
+        amenity = Amenity(name="Wifi")
+        self.storage.new(state)
+        self.storage.new(amenity)
+        self.storage.save()
+        names = self.shards()
+        self.assertEqual(len(names), 2)
+        self.assertNotIn("file.json", names)
+        amenity_shard = [n for n in names if n.startswith("file.Amenity")][0]
+        with open(self.path(amenity_shard), "w") as f:
+            f.write("untouched")
+        state.name = "Utah"
+        self.storage.save()
+        with open(self.path(amenity_shard)) as f:
+            self.assertEqual(f.read(), "untouched")
+        self.storage.delete(state)
+        self.storage.save()
+        self.assertEqual(self.shards(), names)
+
+    def test_reload_merges_shards(self):
+        """
+        Test that 'reload' loads every shard back into the store.
+        """
+        objs = [State(name="S{}".format(i)) for i in range(10)] + \
+            [Amenity(name="A{}".format(i)) for i in range(10)]
+        for obj in objs:
+            self.storage.new(obj)
+        self.storage.save()
+        self.assertEqual(len(self.shards()), 4)
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 10)
+        self.assertEqual(self.storage.count(Amenity), 10)
+
+    def test_reload_changes_layout(self):
+        """
+        Test that 'reload' moves objects between layouts.
+        """
+        FileStorage._FileStorage__shards = 0
+        for i in range(40):
+            self.storage.new(State(name="S{}".format(i)))
+        self.storage.save()
+        self.assertEqual(self.shards(), ["file.json"])
+        FileStorage._FileStorage__shards = 3
+        self.storage.reload()
+        self.assertEqual(self.shards(), ["file.State.{}.json".format(i)
+                                         for i in range(3)])
+        FileStorage._FileStorage__shards = 2
+        self.storage.reload()
+        self.assertEqual(self.shards(), ["file.State.{}.json".format(i)
+                                         for i in range(2)])
+        FileStorage._FileStorage__shards = 0
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        self.storage.reload()
+        self.assertEqual(self.shards(), ["file.json"])
+        self.assertEqual(self.storage.count(State), 40)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageLazy(FileStorageTestCase):
+    """
+    Test cases for the memory-mapped lazy mode of FileStorage.
+    """
+    def setUp(self):
+        """
+        Save ten States and ten Amenities in the binary format.
+        """
+        super().setUp()
+        FileStorage._FileStorage__format = "binary"
+        FileStorage._FileStorage__file_path = self.path("file.hbnb")
+        self.states = [State(name="S{}".format(i)) for i in range(10)]
+        self.amenities = [Amenity(name="A{}".format(i)) for i in range(10)]
+        for obj in self.states + self.amenities:
+            self.storage.new(obj)
+        self.storage.save()
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        FileStorage._FileStorage__lazy = True
+        FileStorage._FileStorage__lazy_max = 3
+        self.storage.reload()
+
+    def tearDown(self):
+        """
+        Unmap the snapshot.
+        """
+        for buffer in FileStorage._FileStorage__maps:
+            buffer.close()
+        FileStorage._FileStorage__lazy_max = 10000
+        super().tearDown()
+
+    def test_reload_loads_nothing(self):
+        """
+        Test that 'reload' only indexes the records.
+        """
+        self.assertEqual(len(FileStorage._FileStorage__objects), 0)
+        self.assertEqual(self.storage.count(), 20)
+        self.assertEqual(self.storage.count(State), 10)
+
+    def test_get_hydrates_and_evicts(self):
+        """
+        Test that 'get' loads objects and keeps at most __lazy_max.
+        """
+        for state in self.states[:5]:
+            obj = self.storage.get(State, state.id)
+            self.assertEqual(obj.name, state.name)
+            self.assertEqual(obj.created_at, state.created_at)
+        self.assertEqual(len(FileStorage._FileStorage__objects), 3)
+        self.assertEqual(self.storage.count(State), 10)
+        self.assertIsNone(self.storage.get(State, self.amenities[0].id))
+
+    def test_changed_objects_are_kept_and_saved(self):
+        """
+        Test that changed objects stay loaded and are written on save.
+        """
+        changed = self.storage.get(State, self.states[0].id)
+        changed.name = "Changed"
+        for state in self.states[1:]:
+            self.storage.get(State, state.id)
+        self.assertIs(self.storage.get(State, changed.id), changed)
+        self.storage.delete(self.storage.get(Amenity, self.amenities[0].id))
+        self.storage.save()
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        FileStorage._FileStorage__unloaded.clear()
+        FileStorage._FileStorage__cached.clear()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(), 19)
+        self.assertEqual(self.storage.get(State, changed.id).name, "Changed")
+
+    def test_all_hydrates_class(self):
+        """
+        Test that 'all' returns every object of the class.
+        """
+        self.assertEqual(len(self.storage.all(Amenity)), 10)
+        self.assertEqual(len(self.storage.all()), 20)
+
+    def test_all_class_objects_are_tracked(self):
+        """
+        Test that changes to the objects returned by 'all' for a class
+        larger than the cache are saved.
+        """
+        for state in self.storage.all(State).values():
+            state.name = "Renamed"
+        self.storage.save()
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        self.storage.reload()
+        self.assertEqual([state.name for state in
+                          self.storage.all(State).values()],
+                         ["Renamed"] * 10)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageCommit(FileStorageTestCase):
+    """
+    Test cases for the atomic writes and group commit of FileStorage.
+    """
+    def test_failed_write_keeps_snapshot(self):
+        """
+        Test that a failed rename leaves the old snapshot and no temp file.
+        """
+        state = State(name="Before")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "After"
+        with mock.patch("os.replace", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.assertEqual(os.listdir(self.tmp), ["file.json"])
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertIn("Before", file.read())
+        self.storage.save()
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertIn("After", file.read())
+
+    def test_failed_append_keeps_changes(self):
+        """
+        Test that changes are saved again after a failed journal append.
+        """
+        FileStorage._FileStorage__journal = True
+        state = State(name="Kept")
+        self.storage.new(state)
+        with mock.patch("json.dumps", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.storage.save()
+        self.assertIn("State." + state.id, FileStorage._FileStorage__dirty)
+        self.storage.save()
+        with open(self.path("file.json.journal"), encoding="utf-8") as file:
+            self.assertIn("Kept", file.read())
+
+    def test_concurrent_saves_are_grouped(self):
+        """
+        Test that saves made during a write share the next write.
+        """
+        persist = FileStorage._FileStorage__persist
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_persist(storage):
+            calls.append(storage)
+            started.set()
+            release.wait(5)
+            persist(storage)
+
+        def save(name):
+            self.storage.new(State(name=name))
+            self.storage.save()
+
+        requested = FileStorage._FileStorage__requested
+        with mock.patch.object(FileStorage, "_FileStorage__persist",
+                               slow_persist):
+            first = threading.Thread(target=save, args=("first",))
+            first.start()
+            started.wait(5)
+            others = [threading.Thread(target=save, args=(str(i),))
+                      for i in range(8)]
+            for thread in others:
+                thread.start()
+            while FileStorage._FileStorage__requested < requested + 9:
+                time.sleep(0.01)
+            release.set()
+            for thread in [first] + others:
+                thread.join(5)
+        self.assertEqual(len(calls), 2)
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertEqual(len(json.load(file)), 9)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageWriteBehind(FileStorageTestCase):
+    """
+    Test cases for the write-behind mode of FileStorage.
+    """
+    def setUp(self):
+        """
+        Turn the write-behind mode on with a long interval.
+        """
+        super().setUp()
+        FileStorage._FileStorage__write_behind = True
+        FileStorage._FileStorage__flush_interval = 60
+        FileStorage._FileStorage__flush_threshold = 5
+
+    def tearDown(self):
+        """
+        Stop the background flusher and turn the mode off.
+        """
+        FileStorage._FileStorage__stop(self.storage)
+        FileStorage._FileStorage__write_behind = False
+        FileStorage._FileStorage__flush_interval = 1
+        FileStorage._FileStorage__flush_threshold = 1000
+        super().tearDown()
+
+    def test_save_defers_write(self):
+        """
+        Test that 'save' returns before writing and 'flush' writes.
+        """
+        self.storage.new(State(name="Deferred"))
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.path("file.json")))
+        self.assertGreater(self.storage.durability_lag(), 0)
+        self.storage.flush()
+        self.assertEqual(self.storage.durability_lag(), 0)
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertIn("Deferred", file.read())
+
+    def test_threshold_wakes_flusher(self):
+        """
+        Test that the flusher writes once enough objects changed.
+        """
+        for i in range(5):
+            self.storage.new(State(name=str(i)))
+        self.storage.save()
+        for _ in range(500):
+            if self.storage.durability_lag() == 0:
+                break
+            time.sleep(0.01)
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertEqual(len(json.load(file)), 5)
+
+    def test_interval_wakes_flusher(self):
+        """
+        Test that the flusher writes changes older than the interval.
+        """
+        FileStorage._FileStorage__flush_interval = 0.05
+        self.storage.new(State(name="Old"))
+        self.storage.save()
+        for _ in range(500):
+            if self.storage.durability_lag() == 0:
+                break
+            time.sleep(0.01)
+        self.assertTrue(os.path.exists(self.path("file.json")))
+
+    def test_stop_flushes(self):
+        """
+        Test that stopping the flusher writes the pending changes.
+        """
+        self.storage.new(State(name="Last"))
+        self.storage.save()
+        FileStorage._FileStorage__stop(self.storage)
+        self.assertIsNone(FileStorage._FileStorage__flusher)
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertIn("Last", file.read())
+
+    def test_close_leaves_changes_to_flusher(self):
+        """
+        Test that 'close' applies the files without writing the pending
+        changes.
+        """
+        pending = State(name="Pending")
+        self.storage.new(pending)
+        self.storage.save()
+        other = State(name="Other")
+        with open(self.path("file.json"), "w", encoding="utf-8") as file:
+            json.dump({"State." + other.id: other.to_dict()}, file)
+        self.storage.close()
+        self.assertGreater(self.storage.durability_lag(), 0)
+        self.assertIs(self.storage.get(State, pending.id), pending)
+        self.assertEqual(self.storage.get(State, other.id).name, "Other")
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertNotIn("Pending", file.read())
+
+    def test_exit_hook_registered_once(self):
+        """
+        Test that restarting the flusher does not register it again.
+        """
+        hook = FileStorage._FileStorage__exit_hook
+        FileStorage._FileStorage__exit_hook = False
+        try:
+            with mock.patch.object(file_storage.atexit, "register") as reg:
+                for name in ("First", "Second"):
+                    self.storage.new(State(name=name))
+                    self.storage.save()
+                    FileStorage._FileStorage__stop(self.storage)
+            self.assertEqual(reg.call_count, 1)
+        finally:
+            FileStorage._FileStorage__exit_hook = hook
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageClose(FileStorageTestCase):
+    """
+    Test cases for the change detection of FileStorage.close.
+    """
+    def setUp(self):
+        """
+        Save three States.
+        """
+        super().setUp()
+        self.states = [State(name="S{}".format(i)) for i in range(3)]
+        for state in self.states:
+            self.storage.new(state)
+        self.storage.save()
+
+    def test_close_skips_unchanged_files(self):
+        """
+        Test that 'close' reads nothing when no file changed.
+        """
+        with mock.patch.object(FileStorage, "_FileStorage__snapshot",
+                               side_effect=AssertionError):
+            self.storage.close()
+            self.storage.close()
+
+    def test_close_applies_changes(self):
+        """
+        Test that 'close' applies updated and removed objects only.
+        """
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            data = json.load(file)
+        first, second, third = ["State." + s.id for s in self.states]
+        data[first]["name"] = "Renamed"
+        data[first]["updated_at"] = "2030-01-01T00:00:00.000000"
+        del data[second]
+        with open(self.path("file.json"), "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, self.states[0].id).name,
+                         "Renamed")
+        self.assertIsNone(self.storage.get(State, self.states[1].id))
+        self.assertIs(self.storage.get(State, self.states[2].id),
+                      self.states[2])
+
+    def test_close_replays_new_journal_records(self):
+        """
+        Test that 'close' only replays the records appended since.
+        """
+        FileStorage._FileStorage__journal = True
+        self.states[0].name = "Journaled"
+        self.storage.save()
+        state = State(name="Appended")
+        record = {"op": "upsert", "key": "State." + state.id,
+                  "obj": state.to_dict()}
+        with open(self.path("file.json.journal"), "a",
+                  encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+        with mock.patch.object(FileStorage, "_FileStorage__load",
+                               wraps=self.storage._FileStorage__load) as load:
+            self.storage.close()
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(self.storage.get(State, state.id).name, "Appended")
+
+    def test_close_reads_changed_shards(self):
+        """
+        Test that 'close' only parses the shards that changed.
+        """
+        FileStorage._FileStorage__shards = 4
+        self.storage.compact()
+        amenity = Amenity(name="New")
+        key = "Amenity." + amenity.id
+        path = self.storage._FileStorage__shard_path(
+            self.storage._FileStorage__shard(key))
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({key: amenity.to_dict()}, file)
+        snapshot = self.storage._FileStorage__snapshot
+        with mock.patch.object(FileStorage, "_FileStorage__snapshot",
+                               wraps=snapshot) as read:
+            self.storage.close()
+        self.assertEqual(read.call_count, 1)
+        self.assertEqual(self.storage.get(Amenity, amenity.id).name, "New")
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+@unittest.skipIf(file_storage.fcntl is None, "no advisory file locks")
+class TestFileStorageMultiprocess(FileStorageTestCase):
+    """
+    Test cases for the multi-process mode of FileStorage.
+    """
+    def setUp(self):
+        """
+        Turn the multi-process mode on and save one State.
+        """
+        super().setUp()
+        FileStorage._FileStorage__multiprocess = True
+        self.state = State(name="Parent")
+        self.storage.new(self.state)
+        self.storage.save()
+
+    def other_process(self, name):
+        """
+        Save a State called name from another process.
+        """
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))))
+        env = dict(os.environ, HBNB_FILE_MULTIPROCESS="1",
+                   PYTHONPATH=root)
+        env.pop("HBNB_TYPE_STORAGE", None)
+        code = ("from models.state import State\n"
+                "State(name={!r}).save()\n").format(name)
+        subprocess.run([sys.executable, "-c", code], cwd=self.tmp, env=env,
+                       check=True)
+
+    def names(self):
+        """
+        Return the names of the States in file.json.
+        """
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            return sorted(obj["name"] for obj in json.load(file).values())
+
+    def test_save_keeps_other_writes(self):
+        """
+        Test that 'save' applies the other process' writes first.
+        """
+        self.other_process("Child")
+        self.storage.new(State(name="Later"))
+        self.storage.save()
+        self.assertEqual(self.names(), ["Child", "Later", "Parent"])
+        self.assertEqual(self.storage.count(State), 3)
+
+    def test_close_pulls_newer_version(self):
+        """
+        Test that 'close' loads the objects of a newer store version.
+        """
+        self.assertEqual(FileStorage._FileStorage__version, 1)
+        self.other_process("Child")
+        self.storage.close()
+        self.assertEqual(FileStorage._FileStorage__version, 2)
+        self.assertEqual(sorted(state.name for state in
+                                self.storage.all(State).values()),
+                         ["Child", "Parent"])
+        with mock.patch.object(FileStorage, "_FileStorage__catch_up",
+                               side_effect=AssertionError):
+            self.storage.close()
+
+    def test_reload_changes_layout_under_exclusive_lock(self):
+        """
+        Test that 'reload' rewrites a stale layout after releasing the
+        shared lock, applying the writes made in between and bumping
+        the store version.
+        """
+        FileStorage._FileStorage__shards = 2
+        compact = self.storage.compact
+        unlocked = []
+
+        def write_then_compact():
+            unlocked.append(FileStorage._FileStorage__lock_file is None)
+            if unlocked[-1]:
+                self.other_process("Child")
+            compact()
+
+        with mock.patch.object(FileStorage, "compact",
+                               side_effect=write_then_compact):
+            self.storage.reload()
+        self.assertEqual(unlocked, [True])
+        self.assertEqual(FileStorage._FileStorage__version, 3)
+        self.assertFalse(os.path.exists(self.path("file.json")))
+        names = []
+        for name in os.listdir(self.tmp):
+            if name.startswith("file.State."):
+                with open(self.path(name), encoding="utf-8") as file:
+                    names.extend(obj["name"]
+                                 for obj in json.load(file).values())
+        self.assertEqual(sorted(names), ["Child", "Parent"])
+
+    def test_files_are_stated_under_lock(self):
+        """
+        Test that 'save' and 'reload' stat the files before unlocking,
+        and that 'reload' records the store version it read.
+        """
+        locked = []
+        stat = self.storage._FileStorage__stat
+
+        def locked_stat():
+            locked.append(FileStorage._FileStorage__lock_file is not None)
+            return stat()
+
+        with mock.patch.object(FileStorage, "_FileStorage__stat",
+                               side_effect=locked_stat):
+            self.storage.new(State(name="Locked"))
+            self.storage.save()
+            self.other_process("Child")
+            self.storage.reload()
+        self.assertTrue(locked)
+        self.assertTrue(all(locked))
+        self.assertEqual(FileStorage._FileStorage__version, 3)
+        self.assertEqual(self.storage.count(State), 3)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageSnapshots(FileStorageTestCase):
+    """
+    Test cases for the snapshots returned by FileStorage.all.
+    """
+    def test_all_is_not_modified_by_writes(self):
+        """
+        Test that writes publish a new snapshot instead of changing one.
+        """
+        kept = State(name="Kept")
+        self.storage.new(kept)
+        before = self.storage.all()
+        states = self.storage.all(State)
+        self.assertIs(self.storage.all(), before)
+        added = State(name="Added")
+        self.storage.new(added)
+        self.storage.delete(kept)
+        self.assertEqual(list(before), ["State." + kept.id])
+        self.assertEqual(list(states), ["State." + kept.id])
+        self.assertEqual(list(self.storage.all(State)),
+                         ["State." + added.id])
+
+    def test_iterate_while_writing(self):
+        """
+        Test that iterating over 'all' is safe while another thread writes.
+        """
+        stop = threading.Event()
+
+        def write():
+            while not stop.is_set():
+                state = State(name="Busy")
+                self.storage.new(state)
+                self.storage.delete(state)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(200):
+                for key, obj in self.storage.all().items():
+                    self.assertIsNotNone(obj)
+        finally:
+            stop.set()
+            writer.join()
+
+    def test_reload_is_published_at_once(self):
+        """
+        Test that 'all' returns the old snapshot until 'reload' finishes.
+        """
+        for i in range(3):
+            self.storage.new(State(name=str(i)))
+        self.storage.save()
+        FileStorage._FileStorage__objects.clear()
+        FileStorage._FileStorage__classes.clear()
+        self.storage.new(State(name="Before"))
+        self.assertEqual(len(self.storage.all()), 1)
+        seen = []
+        load = self.storage._FileStorage__load
+
+        def counting_load(storage, obj_data):
+            seen.append(len(storage.all()))
+            return load(obj_data)
+
+        with mock.patch.object(FileStorage, "_FileStorage__load",
+                               counting_load):
+            self.storage.reload()
+        self.assertEqual(seen, [1, 1, 1])
+        self.assertEqual(len(self.storage.all()), 4)
+
+    def test_own_writes_seen_during_other_batch(self):
+        """
+        Test that a thread sees its own writes while another thread
+        runs a batch.
+        """
+        self.assertEqual(self.storage.all(State), {})
+        started, done = threading.Event(), threading.Event()
+
+        def batch():
+            with self.storage._FileStorage__batch():
+                self.storage.new(State(name="Batched"))
+                started.set()
+                done.wait()
+
+        thread = threading.Thread(target=batch)
+        thread.start()
+        try:
+            started.wait()
+            self.assertEqual(self.storage.all(State), {})
+            state = State(name="Mine")
+            self.storage.new(state)
+            self.assertIn("State." + state.id, self.storage.all(State))
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(len(self.storage.all(State)), 2)
+
+
+@unittest.skipIf(models.sql_storage, "not testing file storage")
+class TestFileStorageTransaction(FileStorageTestCase):
+    """
+    Test cases for FileStorage.transaction.
+    """
+    def setUp(self):
+        """
+        Save one State and one City.
+        """
+        super().setUp()
+        self.state = State(name="Kept")
+        self.city = City(name="Town", state_id=self.state.id)
+        self.storage.new(self.state)
+        self.storage.new(self.city)
+        self.storage.save()
+
+    def test_commit_writes_once(self):
+        """
+        Test that the saves of a transaction are written once at the end.
+        """
+        persist = self.storage._FileStorage__persist
+        with mock.patch.object(FileStorage, "_FileStorage__persist",
+                               side_effect=persist) as write:
+            with self.storage.transaction():
+                place = Place(name="Home", city_id=self.city.id)
+                place.save()
+                self.state.name = "Renamed"
+                self.state.save()
+                self.assertEqual(write.call_count, 0)
+        self.assertEqual(write.call_count, 1)
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            data = json.load(file)
+        self.assertIn("Place." + place.id, data)
+        self.assertEqual(data["State." + self.state.id]["name"], "Renamed")
+
+    def test_rollback_restores_objects(self):
+        """
+        Test that an exception undoes the changes and writes nothing.
+        """
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            before = file.read()
+        with self.assertRaises(ValueError):
+            with self.storage.transaction():
+                place = Place(name="Home", city_id=self.city.id)
+                place.save()
+                self.state.name = "Renamed"
+                self.city.state_id = "other"
+                self.city.population = 10
+                self.storage.delete(self.state)
+                raise ValueError
+        self.assertIsNone(self.storage.get(Place, place.id))
+        self.assertIs(self.storage.get(State, self.state.id), self.state)
+        self.assertEqual(self.state.name, "Kept")
+        self.assertFalse(hasattr(self.city, "population"))
+        self.assertEqual(list(self.storage.related(
+            City, "state_id", self.state.id)), ["City." + self.city.id])
+        self.assertEqual(FileStorage._FileStorage__dirty, {})
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), before)
+
+    def test_rollback_restores_mutated_lists(self):
+        """
+        Test that lists changed in place in a transaction are restored.
+        """
+        place = Place(name="Home", city_id=self.city.id, amenity_ids=["a"])
+        self.storage.new(place)
+        self.storage.save()
+        with self.assertRaises(ValueError):
+            with self.storage.transaction():
+                place.name = "Renamed"
+                place.amenity_ids.append("b")
+                place.amenity_ids = place.amenity_ids + ["c"]
+                raise ValueError
+        self.assertEqual(place.amenity_ids, ["a"])
+        self.assertEqual(self.storage.related(Place, "amenity_ids", "b"),
+                         {})
+        self.assertEqual(self.storage.related(Place, "amenity_ids", "c"),
+                         {})
+
+    def test_rollback_drops_changed_new_object(self):
+        """
+        Test that an object added and then changed in a transaction is
+        dropped when it rolls back.
+        """
+        with self.assertRaises(ValueError):
+            with self.storage.transaction():
+                state = State(name="New")
+                state.save()
+                state.name = "Changed"
+                raise ValueError
+        self.assertIsNone(self.storage.get(State, state.id))
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(FileStorage._FileStorage__dirty, {})
+
+    def test_nested_transaction_joins_outer(self):
+        """
+        Test that a nested transaction is committed by the outer one.
+        """
+        with self.storage.transaction():
+            with self.storage.transaction():
+                State(name="Inner").save()
+            self.assertEqual(self.storage.count(State), 2)
+            with open(self.path("file.json"), encoding="utf-8") as file:
+                self.assertNotIn("Inner", file.read())
+        with open(self.path("file.json"), encoding="utf-8") as file:
+            self.assertIn("Inner", file.read())
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Contains test cases for the ObjectCache class.
+"""
+
+from models.engine import object_cache
+import pep8
+import unittest
+from unittest import mock
+
+ObjectCache = object_cache.ObjectCache
+
+
+class TestObjectCache(unittest.TestCase):
+    """
+    Test cases for the ObjectCache class.
+    """
+    def test_pep8_conformance_object_cache(self):
+        """
+        Test that models/engine/object_cache.py conforms to PEP8.
+        """
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/object_cache.py',
+                                    'tests/test_models/test_engine/'
+                                    'test_object_cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used object is evicted.
+        """
+        cache = ObjectCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_ttl(self):
+        """
+        Test that objects older than the ttl are misses.
+        """
+        cache = ObjectCache(2, ttl=10)
+        with mock.patch("time.monotonic", return_value=100):
+            cache.put("a", 1)
+        with mock.patch("time.monotonic", return_value=105):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_invalidate_and_stats(self):
+        """
+        Test invalidation and the hit/miss statistics.
+        """
+        cache = ObjectCache(4)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.invalidate("a")
+        cache.get("a")
+        self.assertEqual(cache.stats(), {
+            "hits": 1, "misses": 1, "hit_rate": 0.5, "evictions": 0,
+            "size": 0, "capacity": 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
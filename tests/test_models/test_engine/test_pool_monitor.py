@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+"""
+Contains test cases for the PoolMonitor class and the monitored pools.
+"""
+
+from models.engine import pool_monitor
+import os
+import pep8
+import shutil
+from sqlalchemy import create_engine, exc, text
+import tempfile
+import unittest
+from unittest import mock
+
+PoolMonitor = pool_monitor.PoolMonitor
+
+
+class TestPoolMonitor(unittest.TestCase):
+    """
+    Test cases for the PoolMonitor class.
+    """
+    def setUp(self):
+        """
+        Create an engine on a database in a temp dir, with one pooled
+        connection and no overflow.
+        """
+        self.tmp = tempfile.mkdtemp()
+        self.engine = create_engine(
+            "sqlite:///" + os.path.join(self.tmp, "pool.db"),
+            poolclass=pool_monitor.MonitoredQueuePool, pool_size=1,
+            max_overflow=0, pool_timeout=0.01)
+        self.monitor = PoolMonitor()
+        self.monitor.attach(self.engine)
+
+    def tearDown(self):
+        """
+        Close the engine and remove the database.
+        """
+        self.engine.dispose()
+        shutil.rmtree(self.tmp)
+
+    def test_pep8_conformance_pool_monitor(self):
+        """
+        Test that models/engine/pool_monitor.py conforms to PEP8.
+        """
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/pool_monitor.py',
+                                    'tests/test_models/test_engine/'
+                                    'test_pool_monitor.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_checkouts(self):
+        """
+        Test that checkouts are counted and timed.
+        """
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            stats = self.monitor.stats()
+            self.assertEqual(stats["checked_out"], 1)
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        stats = self.monitor.stats()
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["overflow"], 0)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertGreater(stats["checkout_max_ms"], 0)
+        self.assertGreater(stats["wait_max_ms"], 0)
+
+    def test_timeouts(self):
+        """
+        Test that checkouts giving up on an exhausted pool are counted.
+        """
+        with self.engine.connect():
+            with self.assertRaises(exc.TimeoutError):
+                self.engine.connect()
+        stats = self.monitor.stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["checkouts"], 1)
+
+    def test_recreate(self):
+        """
+        Test that the pool keeps reporting after the engine is disposed.
+        """
+        self.engine.dispose()
+        with self.engine.connect():
+            pass
+        self.assertIs(self.engine.pool.monitor, self.monitor)
+        self.assertEqual(self.monitor.stats()["checkouts"], 1)
+        self.assertGreater(self.monitor.checkout_time, 0)
+
+    def test_pool_options(self):
+        """
+        Test that DBStorage reads its pool settings from the environment.
+        """
+        try:
+            from models.engine.db_storage import DBStorage
+        except ImportError:
+            self.skipTest("pymysql is not installed")
+        env = {"HBNB_DB_POOL_SIZE": "20", "HBNB_DB_MAX_OVERFLOW": "0",
+               "HBNB_DB_POOL_RECYCLE": "3600",
+               "HBNB_DB_POOL_PRE_PING": "0"}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(DBStorage.pool_options(), {
+                "pool_size": 20, "max_overflow": 0, "pool_timeout": 30.0,
+                "pool_recycle": 3600, "pool_pre_ping": False})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,449 @@
+#!/usr/bin/python3
+"""
+Contains test cases for the SQLiteStorage class.
+
+The functional tests only run with HBNB_TYPE_STORAGE=sqlite, since the
+models are only mapped to tables for the SQL storage types.
+"""
+
+from contextlib import contextmanager
+import inspect
+import models
+from models.engine import migrations, sqlite_storage
+from models.engine.object_cache import ObjectCache
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+import os
+import pep8
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+SQLiteStorage = sqlite_storage.SQLiteStorage
+
+
+class TestSQLiteStorageDocs(unittest.TestCase):
+    """
+    Test cases for the documentation and style of the SQLiteStorage class.
+    """
+    def test_pep8_conformance_sqlite_storage(self):
+        """
+        Test that models/engine/sqlite_storage.py conforms to PEP8.
+        """
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_sqlite_storage(self):
+        """
+        Test tests/test_models/test_engine/test_sqlite_storage.py for PEP8.
+        """
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_sqlite_storage_docstrings(self):
+        """
+        Test for the module, class and method docstrings.
+        """
+        self.assertTrue(len(sqlite_storage.__doc__) >= 1)
+        self.assertTrue(len(SQLiteStorage.__doc__) >= 1)
+        for name, func in inspect.getmembers(SQLiteStorage,
+                                             inspect.isfunction):
+            self.assertTrue(func.__doc__,
+                            "{:s} method needs a docstring".format(name))
+
+
+@unittest.skipIf(models.storage_type != 'sqlite', "not testing sqlite")
+class TestSQLiteStorage(unittest.TestCase):
+    """
+    Test cases for the SQLiteStorage class functionality.
+    """
+    def setUp(self):
+        """
+        Open a storage on a database in a temp dir.
+        """
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "hbnb.db")
+        self.storage = SQLiteStorage(self.path)
+        self.storage.reload()
+
+    def tearDown(self):
+        """
+        Close the storage and remove the database.
+        """
+        self.storage.close()
+        shutil.rmtree(self.tmp)
+
+    @contextmanager
+    def statements(self):
+        """
+        Collect the SQL statements run on the database in the block.
+        """
+        statements = []
+        engine = self.storage._DBStorage__engine
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        sqlite_storage.event.listen(engine, "before_cursor_execute",
+                                    listener)
+        try:
+            yield statements
+        finally:
+            sqlite_storage.event.remove(engine, "before_cursor_execute",
+                                        listener)
+
+    @staticmethod
+    def verbs(statements):
+        """
+        Return the first keyword of each of statements.
+        """
+        return [statement.split()[0] for statement in statements]
+
+    def test_new_save_get_count(self):
+        """
+        Test that saved objects can be found and counted.
+        """
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        city = City(name="San Francisco", state_id=state.id)
+        self.storage.new(city)
+        self.storage.save()
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertIn("City." + city.id, self.storage.all(City))
+        self.storage.delete(city)
+        self.storage.save()
+        self.assertEqual(self.storage.count(City), 0)
+
+    def test_wal_and_indexes(self):
+        """
+        Test that the database uses WAL and indexes the lookup columns.
+        """
+        db = sqlite3.connect(self.path)
+        try:
+            mode, = db.execute("PRAGMA journal_mode").fetchone()
+            indexes = {row[0] for row in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        finally:
+            db.close()
+        self.assertEqual(mode, "wal")
+        for index in ["ix_states_name", "ix_cities_state_id",
+                      "ix_places_city_id_price_by_night",
+                      "ix_reviews_place_id_created_at", "ix_users_email"]:
+            self.assertIn(index, indexes)
+
+    def test_migrations(self):
+        """
+        Test that a new database is stamped, and that an old one gets the
+        indexes of the current models from migrate().
+        """
+        head = migrations.MIGRATIONS[-1][0]
+        self.assertEqual(self.storage.schema_version(), head)
+        self.assertEqual(self.storage.migrate(), [])
+        self.storage.close()
+        db = sqlite3.connect(self.path)
+        try:
+            db.executescript(
+                "DROP TABLE schema_version;"
+                "DROP INDEX ix_places_city_id_price_by_night;"
+                "DROP INDEX ix_reviews_place_id_created_at;"
+                "DROP INDEX ix_users_email;"
+                "DROP INDEX ix_states_name;")
+        finally:
+            db.close()
+        self.assertEqual(self.storage.schema_version(), 0)
+        self.assertEqual(self.storage.migrate(1), [1])
+        self.assertEqual(self.storage.schema_version(), 1)
+        self.assertEqual(self.storage.migrate(), list(range(2, head + 1)))
+        self.assertEqual(self.storage.schema_version(), head)
+        db = sqlite3.connect(self.path)
+        try:
+            indexes = {row[0] for row in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        finally:
+            db.close()
+        for index in ["ix_states_name", "ix_places_city_id_price_by_night",
+                      "ix_reviews_place_id_created_at", "ix_users_email"]:
+            self.assertIn(index, indexes)
+        for index in ["ix_places_city_id", "ix_reviews_place_id"]:
+            self.assertNotIn(index, indexes)
+
+    def test_connection_per_thread(self):
+        """
+        Test that other threads use their own connection.
+        """
+        self.storage.new(State(name="Nevada"))
+        self.storage.save()
+        counts = []
+        thread = threading.Thread(
+            target=lambda: counts.append(self.storage.count(State)))
+        thread.start()
+        thread.join()
+        self.assertEqual(counts, [1])
+        stats = self.storage.pool_stats()
+        self.assertGreaterEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["overflow"], 0)
+        self.assertEqual(stats["replicas"], [])
+
+    def test_more_threads_than_pool_size(self):
+        """
+        Test that more threads than the pool holds can use the storage
+        at once, waiting for a connection instead of sharing one.
+        """
+        env = {"HBNB_DB_POOL_SIZE": "2", "HBNB_DB_MAX_OVERFLOW": "1"}
+        with mock.patch.dict(os.environ, env):
+            storage = SQLiteStorage(os.path.join(self.tmp, "pool.db"))
+        storage.reload()
+        barrier = threading.Barrier(8)
+        errors = []
+
+        def work(n):
+            try:
+                barrier.wait()
+                for i in range(5):
+                    storage.count(State)
+                    storage.all(State)
+                    storage.new(State(name="{}-{}".format(n, i)))
+                    storage.save()
+                    storage.close()
+            except Exception as e:
+                errors.append(e)
+                storage.close()
+
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(storage.count(State), 40)
+        storage.close()
+        stats = storage.pool_stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_get_by_primary_key(self):
+        """
+        Test that 'get' does not load the whole table.
+        """
+        state = State(name="Oregon")
+        self.storage.new(state)
+        self.storage.save()
+        with mock.patch.object(SQLiteStorage, "all",
+                               side_effect=AssertionError):
+            self.assertIs(self.storage.get(State, state.id), state)
+            self.assertIs(self.storage.get("State", state.id), state)
+            self.assertIsNone(self.storage.get(State, "missing"))
+
+    def test_all_criteria(self):
+        """
+        Test that criteria are turned into a WHERE clause.
+        """
+        oregon = State(name="Oregon")
+        utah = State(name="Utah")
+        self.storage.new(oregon)
+        self.storage.new(utah)
+        self.storage.save()
+        for state, name in [(oregon, "Salem"), (oregon, "Bend"),
+                            (utah, "Provo")]:
+            self.storage.new(City(name=name, state_id=state.id))
+        self.storage.save()
+        with self.statements() as statements:
+            cities = self.storage.all(City, state_id=oregon.id)
+        self.assertEqual(sorted(c.name for c in cities.values()),
+                         ["Bend", "Salem"])
+        self.assertIn("WHERE cities.state_id = ?", statements[-1])
+        self.assertEqual(self.storage.count(City, name__in=["Bend",
+                                                            "Provo"]), 2)
+        self.assertEqual(self.storage.count(name__gte="S"), 2)
+        self.assertEqual(list(self.storage.all(State, name__lt="P")), [
+            "State." + oregon.id])
+
+    def test_prefetch(self):
+        """
+        Test that 'prefetch' loads a path with one query per level.
+        """
+        user = User(email="a@b.c", password="pwd")
+        wifi = Amenity(name="Wifi")
+        self.storage.new(user)
+        self.storage.new(wifi)
+        for i in range(3):
+            state = State(name="State {}".format(i))
+            self.storage.new(state)
+            self.storage.save()
+            for j in range(2):
+                city = City(name="City {}".format(j), state_id=state.id)
+                self.storage.new(city)
+                self.storage.save()
+                place = Place(name="Place", city_id=city.id,
+                              user_id=user.id)
+                place.amenities.append(wifi)
+                self.storage.new(place)
+        self.storage.save()
+        self.storage.close()
+        states = list(self.storage.all(State).values())
+        with self.statements() as statements:
+            self.assertEqual(self.storage.prefetch(
+                states, "cities.places.amenities", "cities.places.user"),
+                states)
+            self.assertEqual(len(statements), 5)
+            amenities = [amenity.name for state in states
+                         for city in state.cities
+                         for place in city.places
+                         for amenity in place.amenities
+                         if place.user is not None]
+            self.assertEqual(amenities, ["Wifi"] * 6)
+            self.assertEqual(len(statements), 5)
+
+    def test_bulk(self):
+        """
+        Test that the bulk methods batch their statements by chunk.
+        """
+        self.storage._DBStorage__chunk_size = 2
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        with self.statements() as statements:
+            self.storage.bulk_new(iter(states))
+            self.assertEqual(self.verbs(statements).count("INSERT"), 3)
+            self.storage.bulk_update(states, name="Renamed")
+            self.assertEqual(self.verbs(statements).count("UPDATE"), 3)
+            city = City(name="Napa", state_id=states[0].id)
+            self.storage.new(city)
+            self.storage.save()
+            self.storage.bulk_delete(states[:4])
+            self.assertEqual(self.verbs(statements).count("DELETE"), 3)
+        self.storage.close()
+        self.assertEqual([state.name for state in
+                          self.storage.all(State).values()], ["Renamed"])
+        self.assertEqual(self.storage.count(City), 0)
+
+    def test_counts(self):
+        """
+        Test that 'counts' reads every class once and then follows the
+        commits.
+        """
+        oregon = State(name="Oregon")
+        self.storage.new(oregon)
+        self.storage.save()
+        with self.statements() as statements:
+            self.assertEqual(self.storage.counts(State, City),
+                             {State: 1, City: 0})
+            self.assertEqual(len(statements), 1)
+            self.assertIn("UNION ALL", statements[0])
+            salem = City(name="Salem", state_id=oregon.id)
+            self.storage.new(salem)
+            self.storage.save()
+            self.storage.delete(oregon)
+            with self.assertRaises(ZeroDivisionError):
+                with self.storage.transaction():
+                    self.storage.new(State(name="Utah"))
+                    self.storage.save()
+                    1 / 0
+            del statements[:]
+            self.assertEqual(self.storage.counts(State, "City"),
+                             {State: 1, City: 1})
+            self.assertEqual(statements, [])
+        self.storage._DBStorage__counts_ttl = 0
+        self.storage.new(State(name="Utah"))
+        self.assertEqual(self.storage.counts()[State], 1)
+        self.storage.save()
+        self.assertEqual(self.storage.counts()[State], 2)
+
+    def test_iter(self):
+        """
+        Test that 'iter' reads the objects by keyset pages.
+        """
+        states = [State(name="State {}".format(i % 2)) for i in range(5)]
+        self.storage.bulk_new(states)
+        ids = sorted(state.id for state in states)
+        with self.statements() as statements:
+            objs = self.storage.iter(State, 2)
+            self.assertEqual(next(objs).id, ids[0])
+            self.assertEqual(len(statements), 1)
+            self.assertEqual([ids[0]] + [obj.id for obj in objs], ids)
+            self.assertEqual(len(statements), 3)
+            self.assertIn("states.id > ?", statements[-1])
+        self.assertEqual([obj.id for obj in self.storage.iter(
+            "State", 2, ids[2])], ids[3:])
+        self.assertEqual(len(list(self.storage.iter(
+            State, after_id=ids[0], name="State 0"))),
+            len([s for s in states if s.name == "State 0" and
+                 s.id > ids[0]]))
+
+    def test_replicas(self):
+        """
+        Test that reads go to the replica until the session writes.
+        """
+        oregon = State(name="Oregon")
+        self.storage.new(oregon)
+        self.storage.save()
+        self.storage.close()
+        replica = os.path.join(self.tmp, "replica.db")
+        source, target = sqlite3.connect(self.path), sqlite3.connect(replica)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        storage = SQLiteStorage(self.path, [replica])
+        storage.reload()
+        try:
+            utah = State(name="Utah")
+            storage.new(utah)
+            storage.save()
+            storage.close()
+            self.assertEqual(list(storage.all(State)),
+                             ["State." + oregon.id])
+            self.assertIsNone(storage.get(State, utah.id))
+            self.assertEqual(storage.count(State), 1)
+            storage.new(State(name="Idaho"))
+            self.assertEqual(storage.count(State), 3)
+            self.assertIsNotNone(storage.get(State, utah.id))
+            storage.close()
+            with storage.transaction():
+                self.assertEqual(storage.count(State), 2)
+            storage.close()
+            self.assertEqual(storage.count(State), 1)
+            stats = storage.pool_stats()
+            self.assertEqual(len(stats["replicas"]), 1)
+            self.assertGreater(stats["replicas"][0]["checkouts"], 0)
+            self.assertGreater(stats["checkouts"], 0)
+        finally:
+            storage.close()
+
+    def test_get_cache(self):
+        """
+        Test that cached objects are reused across sessions until saved.
+        """
+        self.storage._DBStorage__cache = ObjectCache(10)
+        state = State(name="Utah")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.get(State, state.id)
+        self.storage.close()
+        cached = self.storage.get(State, state.id)
+        self.assertEqual(cached.name, "Utah")
+        self.assertEqual(self.storage.cache_stats()["hits"], 1)
+        cached.name = "Idaho"
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, state.id).name, "Idaho")
+        self.assertEqual(self.storage.cache_stats()["misses"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,6 +22,7 @@ def hbnb_filters(id=""):
     states = storage.all(State).values()
     amenities = storage.all(Amenity).values()
     states = sorted(states, key=lambda d: d.name)
+    storage.prefetch(states, "cities")
     amenities = sorted(amenities, key=lambda d: d.name)
 
     return render_template("0-hbnb_filters.html", states=states,
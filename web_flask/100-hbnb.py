@@ -30,6 +30,8 @@ def hbnb():
     cities = sorted(cities, key=lambda d: d.name)
     amenities = sorted(amenities, key=lambda d: d.name)
     places = sorted(places, key=lambda d: d.name)
+    storage.prefetch(states, "cities")
+    storage.prefetch(places, "user")
 
     return render_template("100-hbnb.html", states=states, cities=cities,
                            amenities=amenities, places=places)
@@ -22,6 +22,7 @@ def cities_by_states():
     """Display a HTML page with the list of all State objects
     and their linked City objects."""
     states = sorted(list(storage.all(State).values()), key=lambda x: x.name)
+    storage.prefetch(states, "cities")
     return render_template('8-cities_by_states.html', states=states)
 
 